@@ -0,0 +1,156 @@
+# atlas.py
+
+
+import threading
+import pygame
+from constants import TILE_SIZE, SPRITESHEET_PATH
+from visualeffects import hue_shift_sprite
+
+
+_lock = threading.RLock()   # the level preloader fills the cache from a worker thread
+_sheets = {}
+_tiles = {}
+_shifted = {}
+_spins = {}       # (id(source), steps, flip) -> (source, frames); the source is kept to pin its id
+_stats = {"sheet_hits": 0, "sheet_misses": 0, "tile_hits": 0, "tile_misses": 0,
+          "shift_hits": 0, "shift_misses": 0, "spin_hits": 0, "spin_misses": 0}
+
+
+def get_sheet(path=SPRITESHEET_PATH):
+    """
+    Return the decoded spritesheet surface, loading it from disk only on first use.
+    :param path:
+    :return:
+    """
+    sheet = _sheets.get(path)
+    if sheet is None:
+        with _lock:
+            sheet = _sheets.get(path)
+            if sheet is None:
+                _stats["sheet_misses"] += 1
+                sheet = pygame.image.load(path).convert_alpha()
+                _sheets[path] = sheet
+    else:
+        _stats["sheet_hits"] += 1
+    return sheet
+
+
+def sheet_size(path=SPRITESHEET_PATH):
+    """
+    Get the (width, height) of a spritesheet in pixels.
+    :param path:
+    :return:
+    """
+    return get_sheet(path).get_size()
+
+
+def get_tile(col, row, path=SPRITESHEET_PATH):
+    """
+    Return a cached TILE_SIZE subsurface of the spritesheet at grid position (col, row).
+    :param col:
+    :param row:
+    :param path:
+    :return:
+    """
+    key = (path, col, row)
+    tile = _tiles.get(key)
+    if tile is None:
+        with _lock:
+            tile = _tiles.get(key)
+            if tile is None:
+                _stats["tile_misses"] += 1
+                rect = pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                tile = get_sheet(path).subsurface(rect)
+                _tiles[key] = tile
+    else:
+        _stats["tile_hits"] += 1
+    return tile
+
+
+def get_tiles(path=SPRITESHEET_PATH):
+    """
+    Return every tile of the spritesheet in row-major order.
+    :param path:
+    :return:
+    """
+    width, height = sheet_size(path)
+    return [get_tile(x, y, path) for y in range(height // TILE_SIZE) for x in range(width // TILE_SIZE)]
+
+
+def get_hue_shifted(col, row, shift, path=SPRITESHEET_PATH):
+    """
+    Return a cached hue-shifted copy of the tile at (col, row).
+    :param col:
+    :param row:
+    :param shift: hue rotation in the range 0.0-1.0
+    :param path:
+    :return:
+    """
+    key = (path, col, row, round(shift, 4))
+    surface = _shifted.get(key)
+    if surface is None:
+        with _lock:
+            surface = _shifted.get(key)
+            if surface is None:
+                _stats["shift_misses"] += 1
+                surface = hue_shift_sprite(get_tile(col, row, path), shift)
+                _shifted[key] = surface
+    else:
+        _stats["shift_hits"] += 1
+    return surface
+
+
+def get_spin_frames(surface, steps, flip=False):
+    """
+    Return steps copies of surface rotated clockwise in equal increments (index 0 is
+    unrotated), mirrored horizontally first when flip is set. Built once per sprite.
+    :param surface: a long-lived sprite, e.g. from get_tile() or get_hue_shifted()
+    :param steps: number of angular steps over a full turn
+    :param flip: mirror the sprite (left-facing variant)
+    :return:
+    """
+    key = (id(surface), steps, flip)
+    entry = _spins.get(key)
+    if entry is None:
+        with _lock:
+            entry = _spins.get(key)
+            if entry is None:
+                _stats["spin_misses"] += 1
+                base = pygame.transform.flip(surface, True, False) if flip else surface
+                frames = [base] + [pygame.transform.rotate(base, -360.0 * i / steps) for i in range(1, steps)]
+                entry = (surface, frames)
+                _spins[key] = entry
+    else:
+        _stats["spin_hits"] += 1
+    return entry[1]
+
+
+def get_flipped(surface):
+    """
+    Return a cached horizontally mirrored copy of surface.
+    :param surface:
+    :return:
+    """
+    return get_spin_frames(surface, 1, flip=True)[0]
+
+
+def cache_stats():
+    """
+    Return a copy of the hit/miss counters.
+    :return:
+    """
+    return dict(_stats)
+
+
+def clear_cache():
+    """
+    Drop every cached sheet, tile and hue-shifted variant (e.g. after the display mode changes).
+    :return:
+    """
+    with _lock:
+        _sheets.clear()
+        _tiles.clear()
+        _shifted.clear()
+        _spins.clear()
+        for key in _stats:
+            _stats[key] = 0
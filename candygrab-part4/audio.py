@@ -0,0 +1,175 @@
+# audio.py
+#
+# One audio service for the whole game. Sound effects are decoded once at startup (deduped
+# by path) and each name is capped to a few simultaneous channels, so rapid fire or a
+# wave of villains waking up cannot starve the mixer. Music files are read into memory on
+# a background thread ahead of time and started from memory on the main thread; only the
+# most recently used few are kept (the jingles plus the current and next level's). Until
+# preload() is called with the mixer initialised (e.g. headless runs) every call is a no-op.
+
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+import logger
+
+
+# name -> (path, volume, max simultaneous channels)
+SOUND_EFFECTS = {
+    "fire": ("assets/sounds/ghost-neutron.wav", 0.5, 2),
+    "candy": ("assets/sounds/grab-candy.wav", 0.5, 2),
+    "wake": ("assets/sounds/villain-wake.wav", 0.6, 2),
+}
+TITLE_MUSIC = "assets/music/dorf.xm"
+LEVEL_COMPLETE_MUSIC = "assets/music/c-viou.xm"
+# music files kept in memory: title and level-complete jingles, current and next level
+MUSIC_CACHE_SIZE = 4
+
+
+class SoundHandle:
+    """
+    A preloaded Sound plus its channel cap; play() is skipped while the cap is reached.
+    """
+    __slots__ = ("sound", "max_channels")
+
+    def __init__(self, sound, max_channels):
+        self.sound = sound
+        self.max_channels = max_channels
+
+    def play(self):
+        if self.sound is None or self.sound.get_num_channels() >= self.max_channels:
+            return None
+        return self.sound.play()
+
+
+_SILENT = SoundHandle(None, 0)
+
+
+class AudioService:
+    """
+    Preloaded sound effects and prefetched music tracks.
+    """
+    def __init__(self, effects=SOUND_EFFECTS, music_capacity=MUSIC_CACHE_SIZE):
+        self.effects = effects
+        self.music_capacity = music_capacity
+        self.enabled = False
+        self._by_path = {}     # path -> Sound, so a file shared by several names is decoded once
+        self._handles = {}     # name -> SoundHandle
+        self._music = OrderedDict()  # path -> Future of the file's bytes, most recently used last
+        self._lock = threading.Lock()
+        self._executor = None
+
+
+    def preload(self):
+        """
+        Decode every sound effect. Does nothing (and leaves the service silent) if the
+        mixer is not initialised.
+        :return:
+        """
+        self.enabled = bool(pygame.mixer.get_init())
+        if not self.enabled:
+            return
+        for name, (path, volume, max_channels) in self.effects.items():
+            sound = self._by_path.get(path)
+            if sound is None:
+                try:
+                    sound = pygame.mixer.Sound(path)
+                except (pygame.error, FileNotFoundError) as e:
+                    logger.conlog("Could not load sound '%s': %s", path, e, level=logger.WARNING)
+                    continue
+                sound.set_volume(volume)
+                self._by_path[path] = sound
+            self._handles[name] = SoundHandle(sound, max_channels)
+
+
+    def sound(self, name):
+        """
+        Return the handle for a sound effect (a silent one if unknown or disabled).
+        :param name:
+        :return:
+        """
+        return self._handles.get(name, _SILENT)
+
+
+    def play(self, name):
+        """
+        Play a preloaded sound effect, unless it is already on max_channels channels.
+        :param name:
+        :return:
+        """
+        return self._handles.get(name, _SILENT).play()
+
+
+    def prefetch_music(self, path):
+        """
+        Start reading a music file into memory on the background thread, evicting the least
+        recently used file beyond music_capacity.
+        :param path:
+        :return:
+        """
+        if not self.enabled or not path:
+            return
+        with self._lock:
+            if path in self._music:
+                self._music.move_to_end(path)
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="music")
+            self._music[path] = self._executor.submit(_read_file, path)
+            while len(self._music) > self.music_capacity:
+                _, evicted = self._music.popitem(last=False)
+                evicted.cancel()
+
+
+    def play_music(self, path, volume=None, loops=-1):
+        """
+        Replace the current music track, from memory if it was prefetched.
+        :param path:
+        :param volume: new music volume (None keeps the current one)
+        :param loops: -1 repeats forever
+        :return:
+        """
+        if not self.enabled or not path:
+            return
+        with self._lock:
+            future = self._music.get(path)
+            if future is not None:
+                self._music.move_to_end(path)
+        source = path
+        if future is not None:
+            try:
+                source = io.BytesIO(future.result())
+            except OSError:
+                source = path
+        try:
+            pygame.mixer.music.stop()
+            if isinstance(source, io.BytesIO):
+                pygame.mixer.music.load(source, os.path.basename(path))
+            else:
+                pygame.mixer.music.load(source)
+            if volume is not None:
+                pygame.mixer.music.set_volume(volume)
+            pygame.mixer.music.play(loops)
+        except Exception as e:
+            print(f"Could not play music '{path}': {e}")
+
+
+    def stop_music(self):
+        """
+        Stop the current music track.
+        :return:
+        """
+        if self.enabled:
+            pygame.mixer.music.stop()
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+# shared service used by the game; main preloads it after initialising the mixer
+audio = AudioService()
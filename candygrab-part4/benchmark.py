@@ -0,0 +1,123 @@
+# benchmark.py
+#
+# Micro-benchmarks for engine hot spots. Run from the project folder:
+#   python benchmark.py
+
+
+import os
+import json
+import time
+import numpy as np
+import pygame
+from constants import SPRITESHEET_PATH, VILLAIN_AI
+from visualeffects import hue_shift_sprite, hue_shift_sprite_reference
+from loader import load_map
+from player import Player
+from game_init import spawn_villains, find_all_villain_spawns
+from display import update_villains
+from swarm import VillainSwarm
+from headless import run_headless
+
+
+def _time_call(fn, repeat):
+    """
+    Return the best wall-clock time (seconds) of fn() over the given number of runs.
+    :param fn:
+    :param repeat:
+    :return:
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_hue_shift(shift=0.5, repeat=3):
+    """
+    Compare the colorsys reference hue shift against the vectorized one on the full sheet.
+    :param shift:
+    :param repeat:
+    :return:
+    """
+    sheet = pygame.image.load(SPRITESHEET_PATH).convert_alpha()
+    old = hue_shift_sprite_reference(sheet, shift)
+    new = hue_shift_sprite(sheet, shift)
+    diff = np.abs(pygame.surfarray.array3d(old).astype(np.int16) -
+                  pygame.surfarray.array3d(new).astype(np.int16))
+    t_old = _time_call(lambda: hue_shift_sprite_reference(sheet, shift), repeat)
+    t_new = _time_call(lambda: hue_shift_sprite(sheet, shift), repeat)
+    w, h = sheet.get_size()
+    print(f"hue_shift_sprite on {w}x{h} sheet (shift={shift})")
+    print(f"  reference (colorsys): {t_old * 1000:9.2f} ms")
+    print(f"  vectorized (numpy):   {t_new * 1000:9.2f} ms   ({t_old / t_new:.1f}x)")
+    print(f"  max channel difference: {int(diff.max())} LSB")
+
+
+def bench_villain_update(counts=(4, 32, 128, 512), steps=600, map_path="assets/maps/level2.txt"):
+    """
+    Compare per-object Villain.update against VillainSwarm, with villains cycled over the
+    level's spawn points, and check both end in the same state.
+    :param counts: villain counts to try
+    :param steps: simulation steps per run
+    :param map_path:
+    :return:
+    """
+    print(f"villain update, {steps} steps on {map_path}")
+    for n in counts:
+        results = []
+        for batched in (False, True):
+            map_data = load_map(map_path)
+            spawns = find_all_villain_spawns(map_data)
+            villains = spawn_villains(map_data, spawns=[spawns[i % len(spawns)] for i in range(n)])
+            player = Player(map_data)
+            swarm = VillainSwarm(villains, map_data) if batched else None
+            start = time.perf_counter()
+            for step in range(steps):
+                now = step * 8
+                if swarm:
+                    swarm.update(player, map_data, now)
+                else:
+                    update_villains(villains, player, map_data, now)
+            elapsed = time.perf_counter() - start
+            results.append((elapsed, [(v.x, v.y) for v in villains]))
+        (t_ref, ref), (t_swarm, batch) = results
+        print(f"  {n:4d} villains: per-object {t_ref / steps * 1e6:8.1f} us/step   "
+              f"swarm {t_swarm / steps * 1e6:8.1f} us/step   ({t_ref / t_swarm:.1f}x)   "
+              f"identical: {ref == batch}")
+
+
+def bench_villain_ai(frames=20000, seed=1, level_index=1, config="config/levels.json"):
+    """
+    Run the same scripted session headless under each villain AI strategy in VILLAIN_AI.
+    :param frames:
+    :param seed:
+    :param level_index:
+    :param config:
+    :return:
+    """
+    with open(config) as f:
+        all_levels = json.load(f)["levels"]
+    print(f"villain AI strategies, {frames} steps on level {level_index} (seed {seed})")
+    for ai in VILLAIN_AI:
+        stats = run_headless(all_levels, level_index, frames, seed, advance_levels=False, villain_ai=ai)
+        print(f"  {ai:<6} {stats['ticks_per_sec']:8.0f} ticks/s   score {stats['score']:5d}   "
+              f"deaths {stats['deaths']:3d}   checksum {stats['checksum']}")
+
+
+def main():
+    """
+    Set up a hidden display (needed for convert_alpha) and run all benchmarks.
+    :return:
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    bench_hue_shift()
+    bench_villain_update()
+    bench_villain_ai()
+
+
+if __name__ == '__main__':
+    main()
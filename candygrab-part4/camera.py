@@ -0,0 +1,64 @@
+# camera.py
+
+
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, UI_OFFSET, TILE_SIZE
+
+
+class Camera:
+    """
+    Scrolling viewport over the level in world pixels. It follows the player and is clamped
+    to the map, so maps that fit on screen never scroll.
+    """
+    def __init__(self, world_width, world_height, view_width=SCREEN_WIDTH, view_height=SCREEN_HEIGHT - UI_OFFSET):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.view_width = view_width
+        self.view_height = view_height
+        self.x = 0
+        self.y = 0
+
+
+    @classmethod
+    def for_map(cls, map_data, **kwargs):
+        """
+        Build a camera sized to a level map.
+        :param map_data:
+        :return:
+        """
+        return cls(len(map_data[0]) * TILE_SIZE, len(map_data) * TILE_SIZE, **kwargs)
+
+
+    def follow(self, x, y):
+        """
+        Centre the view on a world position (e.g. the player), clamped to the map edges.
+        :param x:
+        :param y:
+        :return:
+        """
+        cx = int(x) + TILE_SIZE // 2 - self.view_width // 2
+        cy = int(y) + TILE_SIZE // 2 - self.view_height // 2
+        self.x = max(0, min(cx, self.world_width - self.view_width))
+        self.y = max(0, min(cy, self.world_height - self.view_height))
+
+
+    def is_visible(self, x, y, w=TILE_SIZE, h=TILE_SIZE):
+        """
+        Check whether a world-space rectangle overlaps the view.
+        :param x:
+        :param y:
+        :param w:
+        :param h:
+        :return:
+        """
+        return x + w > self.x and x < self.x + self.view_width and y + h > self.y and y < self.y + self.view_height
+
+
+    def visible_tiles(self):
+        """
+        Return the range of tiles (x0, y0, x1, y1), end-exclusive, that overlap the view.
+        :return:
+        """
+        x0, y0 = self.x // TILE_SIZE, self.y // TILE_SIZE
+        x1 = -(-(self.x + self.view_width) // TILE_SIZE)
+        y1 = -(-(self.y + self.view_height) // TILE_SIZE)
+        return x0, y0, x1, y1
@@ -1,15 +1,16 @@
 # combat.py
 
-import pygame
-from fire import FireBeam
+from fire import beam_pool
+from audio import audio
 from scanner import NON_ELIGIBLE
 from movement import get_tile_position
 from tilemap import player_cell
+from occupancy import TileOccupancy
 from logger import conlog
 from constants import *
 
 
-def handle_firing(player, map_data, villains, beams, now_ms, hud):
+def handle_firing(player, map_data, villains, beams, now_ms, hud, occupancy=None, pool=None):
     """
     Handle the player's firing action: create a beam, apply damage to villains, update score.
     :param player:
@@ -18,6 +19,8 @@ def handle_firing(player, map_data, villains, beams, now_ms, hud):
     :param beams:
     :param now_ms:
     :param hud:
+    :param occupancy: this frame's TileOccupancy of villains (optional)
+    :param pool: BeamPool to take the beam from (defaults to the shared pool)
     :return:
     """
     allowed = player_cell(map_data, player) not in NON_ELIGIBLE
@@ -25,38 +28,36 @@ def handle_firing(player, map_data, villains, beams, now_ms, hud):
         allowed = allowed and player.can_fire(map_data)
     if not allowed:
         return
-    beam = FireBeam(player, now_ms)
-    newly_disabled = beam.apply_damage_once(villains, map_data, player, now_ms) or 0
+    beam = (pool or beam_pool).acquire(player, now_ms)
+    newly_disabled = beam.apply_damage_once(villains, map_data, player, now_ms, occupancy) or 0
     if newly_disabled:
         gained = 100 * newly_disabled
         hud.score += gained
-        conlog(f"[Combat] Disabled {newly_disabled} robot(s); +{gained} points. Total={hud.score}")
+        conlog("[Combat] Disabled %d robot(s); +%d points. Total=%d", newly_disabled, gained, hud.score,
+               category="combat")
     beams.append(beam)
-    global FIRE_SOUND
-    if FIRE_SOUND is None:
-        FIRE_SOUND = pygame.mixer.Sound("assets/sounds/ghost-neutron.wav")
-        FIRE_SOUND.set_volume(0.5)
-    FIRE_SOUND.play()
+    audio.play("fire")
 
 
-def check_and_trigger_player_death(player, villains, map_data, now_ms):
+def check_and_trigger_player_death(player, villains, map_data, now_ms, occupancy=None):
     """
     Check if the player is colliding with any villains and trigger death if so.
     :param player:
     :param villains:
     :param map_data:
     :param now_ms:
+    :param occupancy: this frame's TileOccupancy of villains (optional)
     :return:
     """
     if getattr(player, "is_dying", lambda: False)() or getattr(player, "is_invulnerable", lambda _t: False)(now_ms):
         return
     if player_cell(map_data, player) in NON_ELIGIBLE:
         return
+    if occupancy is None:
+        occupancy = TileOccupancy(villains)
     pcx, pcy = get_tile_position(player)
-    for v in villains:
-        if getattr(v, "is_disabled", lambda: False)():
+    for v in occupancy.at(pcx, pcy):
+        if getattr(v, "is_disabled", lambda _t=None: False)(now_ms):
             continue
-        vcx, vcy = get_tile_position(v)
-        if vcx == pcx and vcy == pcy:
-            player.start_death(now_ms)
-            break
+        player.start_death(now_ms)
+        break
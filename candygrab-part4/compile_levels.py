@@ -0,0 +1,98 @@
+# compile_levels.py
+#
+# Pre-resolves every level in config/levels.json into one flat binary file next to its map
+# (assets/maps/level2.txt -> assets/maps/level2.lvl): the padded tile grid, the tileset
+# coordinates and scores, and the player, villain and candy positions. The layout is fixed
+# (see COMPILED_* in loader.py), so loading is a single read plus struct unpacking;
+# loader.prepare_level uses it instead of parsing the text map and CSV, and the spawn
+# scans are skipped. Files record the mtimes of their sources and are ignored once either
+# source changes.
+#   python compile_levels.py [--config config/levels.json] [--check]
+
+
+import json
+import argparse
+from constants import TILE_SIZE, DEFAULT_CANDY
+from loader import (load_map, load_tileset, compiled_path, read_compiled_header, _source_mtime,
+                    COMPILED_MAGIC, COMPILED_VERSION, COMPILED_HEADER, COMPILED_LOOKUP,
+                    COMPILED_VILLAIN, COMPILED_CANDY)
+
+
+def compile_level(level):
+    """
+    Encode one level in the compiled format.
+    :param level: entry from levels.json
+    :return: (bytes, villain count, candy count)
+    """
+    grid = load_map(level["map"])
+    lookup = load_tileset(level["lookup"])
+    player = grid.positions_of('P')
+    villains = grid.positions_of('V')
+    candy = grid.positions_of(DEFAULT_CANDY)
+    px, py = (player[0][0] * TILE_SIZE, player[0][1] * TILE_SIZE) if player else (0, 0)
+    parts = [COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, grid.width, grid.height,
+                                  len(lookup), len(villains), len(candy), px, py,
+                                  _source_mtime(level["map"]), _source_mtime(level["lookup"])),
+             grid.to_bytes()]
+    for ch in sorted(lookup):
+        (x, y), score = lookup[ch]['coords'], lookup[ch]['score']
+        parts.append(COMPILED_LOOKUP.pack(ord(ch), x, y, score))
+    for x, y, _ch in villains:
+        parts.append(COMPILED_VILLAIN.pack(x * TILE_SIZE, y * TILE_SIZE))
+    for x, y, ch in candy:
+        parts.append(COMPILED_CANDY.pack(x, y, ord(ch)))
+    return b''.join(parts), len(villains), len(candy)
+
+
+def is_current(level):
+    """
+    Check whether a level's compiled file exists and matches its sources.
+    :param level:
+    :return:
+    """
+    try:
+        with open(compiled_path(level), 'rb') as f:
+            header = read_compiled_header(f.read(COMPILED_HEADER.size))
+    except OSError:
+        return False
+    if header is None:
+        return False
+    return list(header[-2:]) == [_source_mtime(level["map"]), _source_mtime(level["lookup"])]
+
+
+def define_args():
+    """
+    Define command line arguments for the level compiler.
+    :return:
+    """
+    parser = argparse.ArgumentParser(description="Compile Candy Grab levels to binary .lvl files.")
+    parser.add_argument("--config", default="config/levels.json", help="levels JSON file")
+    parser.add_argument("--check", action="store_true", help="only report which files are missing or stale")
+    return parser.parse_args()
+
+
+def main():
+    """
+    Compile (or check) every level in the config.
+    :return:
+    """
+    args = define_args()
+    with open(args.config) as f:
+        all_levels = json.load(f)["levels"]
+    for level in all_levels:
+        path = compiled_path(level)
+        if args.check:
+            print(f"{path}: {'up to date' if is_current(level) else 'missing or stale'}")
+            continue
+        try:
+            data, villains, candy = compile_level(level)
+        except OSError as e:
+            print(f"{level['map']}: skipped ({e})")
+            continue
+        with open(path, 'wb') as f:
+            f.write(data)
+        print(f"{level['map']} -> {path} ({len(data)} bytes, {villains} villains, {candy} candy)")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,12 +3,23 @@ from typing import Iterable, Tuple, Set, List, Any
 
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
 FPS = 60
+SIM_HZ = 120                      # fixed simulation rate, independent of the render rate
+STEP_MS = 1000 / SIM_HZ
+STEP_SCALE = FPS / SIM_HZ         # converts per-60Hz-frame speeds to per-step speeds
+ANIM_TICKS = 10 * SIM_HZ // FPS   # steps per animation frame (was every 10 frames)
+SNAP_TICKS = 120 * SIM_HZ // FPS  # steps between floor-snap checks (was every 120 frames)
+STUCK_TICKS = 45 * SIM_HZ // FPS  # steps in one tile before a "ladder" villain jostles free
+MAX_SIM_STEPS = 12                # steps run per rendered frame at most (100 ms); the rest is dropped
 UI_OFFSET = 96
 UI_HEIGHT = 96
 TILE_SIZE = 32
 SPRITESHEET_PATH = "assets/sprites/sheet.png"
 FONT_PATH = "assets/fonts/Eight-Bit Madness.ttf"
 SHOW_TILE_COORDS = False
+MIN_MAP_COLS = 25                 # narrower maps are padded to this width
+CHUNK_TILES = 16                  # tilemap chunk size (tiles per side) for large maps
+MAX_CACHED_CHUNKS = 48            # drawn chunks kept around before the least recently used is dropped
+FULL_SURFACE_MAX_TILES = 64 * 64  # maps up to this many tiles get one pre-drawn surface
 
 PADDING = 12
 ICON_SPACING = 8
@@ -16,10 +27,11 @@ TEXT_COLOR = (255, 255, 255)
 BAR_BG = (0, 0, 0)
 
 BEAM_DURATION_MS = 300  # ~0.3s
+BEAM_ALPHA_STEPS = 16   # pre-faded beam frames
 PROJ_SX, PROJ_SY = 0, 2
-FIRE_SOUND = None
 
 DEATH_ANIM_MS = 3000
+DEATH_SPIN_STEPS = 36     # pre-rotated frames per sprite for the death spin (10 deg each)
 DEATH_COOLDOWN_MS = 5000  # cannot die again for 5s after animation ends
 
 # Tiles where combat/impact checks are not eligible
@@ -28,6 +40,14 @@ NON_ELIGIBLE = {'L', 'D', 'U', 'E', 'T'}
 # Default candy set; adjust if your tiles.csv uses different symbols
 DEFAULT_CANDY: Set[str] = {'@', '!', '#', '$'}
 
+# Villain AI strategies, selectable per level ("villain_ai" in levels.json) or per World:
+#   nav    shortest path over the level's NavGraph, falling back to steering (part 4)
+#   steer  tile-local steering towards the player only, no path graph (as before NavGraph)
+#   ladder part 3's chase: walk at the player, hunt for a ladder when blocked, jostle free
+#          when stuck (no path graph)
+VILLAIN_AI = ("nav", "steer", "ladder")
+DEFAULT_VILLAIN_AI = "nav"
+
 DISABLE_WINDOW_MS = 2000
 DISABLE_DURATION_MS = 30000
 
@@ -2,54 +2,83 @@
 
 import pygame
 from scoredisplay import FONT_PATH
-from constants import UI_OFFSET
+from fire import beam_pool
+from audio import audio, TITLE_MUSIC, LEVEL_COMPLETE_MUSIC
+from constants import UI_OFFSET, TILE_SIZE
 
 
-def update_villains(villains, player, map_data):
+def update_villains(villains, player, map_data, now_ms=None):
     """
     Update all villains with respect to the player's position and the map data.
     :param villains:
     :param player:
     :param map_data:
+    :param now_ms: game clock in ms (defaults to pygame ticks)
     :return:
     """
     for v in villains:
-        v.update(player, map_data)
+        v.update(player, map_data, now_ms)
 
 
-def update_beams(beams, now_ms):
+def update_beams(beams, now_ms, pool=None):
     """
-    Update all beams and remove any that are dead.
+    Update all beams and remove any that are dead, handing them back to the pool.
     :param beams:
     :param now_ms:
+    :param pool: BeamPool that receives dead beams (defaults to the shared pool)
     :return:
     """
+    pool = pool or beam_pool
+    live = []
     for b in beams:
         b.update(now_ms)
-    beams[:] = [b for b in beams if not b.is_dead()]
+        if b.is_dead():
+            pool.release(b)
+        else:
+            live.append(b)
+    beams[:] = live
 
 
-def render_frame(screen, tile_surface, player, villains, score_display, hud, beams, ui_offset=UI_OFFSET):
+def render_frame(screen, tile_surface, player, villains, score_display, hud, beams, ui_offset=UI_OFFSET,
+                 profiler=None, alpha=1.0, now_ms=None, camera=None):
     """
     Render the entire game frame: background, HUD, player, villains, and beams.
     :param screen:
-    :param tile_surface:
+    :param tile_surface: TileMapSurface / ChunkedTileMap, or an already drawn map Surface
     :param player:
     :param villains:
     :param score_display:
     :param hud:
     :param beams:
     :param ui_offset:
+    :param profiler: FrameProfiler whose overlay is drawn over the HUD bar (optional)
+    :param alpha: interpolation between the last two simulation steps (0.0-1.0)
+    :param now_ms: simulation time being rendered (defaults to pygame ticks)
+    :param camera: Camera for scrolling maps; entities outside its view are not drawn (optional)
     :return:
     """
     screen.fill((0, 0, 0))
     score_display.draw(screen, hud.level_number, hud.score, hud.lives)
-    screen.blit(tile_surface, (0, ui_offset))
-    player.draw(screen, offset_y=ui_offset)
+    if camera is None:
+        offset_x, offset_y = 0, ui_offset
+    else:
+        offset_x, offset_y = -camera.x, ui_offset - camera.y
+        screen.set_clip(pygame.Rect(0, ui_offset, camera.view_width, camera.view_height))
+    if isinstance(tile_surface, pygame.Surface):
+        screen.blit(tile_surface, (offset_x, offset_y))
+    else:
+        tile_surface.draw(screen, camera, ui_offset)
+    player.draw(screen, offset_y=offset_y, alpha=alpha, offset_x=offset_x)
     for v in villains:
-        v.draw(screen, offset_y=ui_offset)
+        if camera is None or camera.is_visible(v.x, v.y):
+            v.draw(screen, offset_y=offset_y, now_ms=now_ms, alpha=alpha, offset_x=offset_x)
     for b in beams:
-        b.draw(screen, offset_y=ui_offset)
+        if camera is None or any(camera.is_visible(cx * TILE_SIZE, cy * TILE_SIZE) for cx, cy in b.tiles):
+            b.draw(screen, offset_y=offset_y, now_ms=now_ms, offset_x=offset_x)
+    if camera is not None:
+        screen.set_clip(None)
+    if profiler is not None:
+        profiler.draw_overlay(screen)
     pygame.display.flip()
 
 
@@ -62,13 +91,7 @@ def show_level_complete(screen, level_number, lives_remaining, MUSIC_VOLUME):
     :param MUSIC_VOLUME:
     :return:
     """
-    pygame.mixer.music.stop()
-    try:
-        pygame.mixer.music.load("assets/music/c-viou.xm")
-        pygame.mixer.music.set_volume(MUSIC_VOLUME)
-        pygame.mixer.music.play(-1)
-    except Exception as e:
-        print(f"Failed to load level complete music: {e}")
+    audio.play_music(LEVEL_COMPLETE_MUSIC, MUSIC_VOLUME)
     overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
     font = pygame.font.Font(FONT_PATH, 36)
     clock = pygame.time.Clock()
@@ -121,8 +144,7 @@ def show_title_card(screen):
     end_y = ((screen_height - img_height) // 2) - 50
     current_y = start_y
     # Preload music if any is expected
-    pygame.mixer.music.load("assets/music/dorf.xm")
-    pygame.mixer.music.play(-1)
+    audio.play_music(TITLE_MUSIC)
     blink_timer = 0
     blink_interval = 500  # ms
     show_text = True
@@ -1,11 +1,29 @@
 # fire.py
 
 
-import pygame
-from spritesheet import TILE_SIZE as _CHECK_TILE  # sanity check same size
 from movement import get_tile_position
+from occupancy import TileOccupancy
 from scanner import NON_ELIGIBLE  # {'L','D','U','E'}
-from constants import SPRITESHEET_PATH, BEAM_DURATION_MS, PROJ_SX, PROJ_SY, TILE_SIZE
+from atlas import get_tile
+from constants import SPRITESHEET_PATH, BEAM_DURATION_MS, BEAM_ALPHA_STEPS, PROJ_SX, PROJ_SY, TILE_SIZE
+
+
+_beam_frames = []
+
+
+def get_beam_frames():
+    """
+    Return the shared fade table: BEAM_ALPHA_STEPS copies of the projectile tile, from fully
+    opaque down to nearly transparent. Built once on first use.
+    :return:
+    """
+    if not _beam_frames:
+        sprite = get_tile(PROJ_SX, PROJ_SY, SPRITESHEET_PATH)
+        for i in range(BEAM_ALPHA_STEPS):
+            frame = sprite.copy()
+            frame.set_alpha(int(255 * (1.0 - i / BEAM_ALPHA_STEPS)))
+            _beam_frames.append(frame)
+    return _beam_frames
 
 
 class FireBeam:
@@ -13,10 +31,21 @@ class FireBeam:
     Represents a short-lived beam projectile fired by the player.
     """
     def __init__(self, player, now_ms):
+        self.frames = get_beam_frames()
+        self.reset(player, now_ms)
+
+
+    def reset(self, player, now_ms):
+        """
+        (Re)start the beam at the player's position, so pooled beams can be reused.
+        :param player:
+        :param now_ms:
+        :return:
+        """
         self.spawn_ms = now_ms
         self.tiles = self._compute_tiles(player)
-        self.sprite = self._load_projectile_sprite()
         self._alpha = 255
+        self._frame = 0
 
 
     def _compute_tiles(self, player):
@@ -31,23 +60,14 @@ class FireBeam:
         return [(pcx + step * i, pcy) for i in range(1, 4)]
 
 
-    def _load_projectile_sprite(self):
-        """
-        Load and return the projectile sprite from the spritesheet.
-        :return:
-        """
-        sheet = pygame.image.load(SPRITESHEET_PATH).convert_alpha()
-        rect = pygame.Rect(PROJ_SX * TILE_SIZE, PROJ_SY * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-        return sheet.subsurface(rect)
-
-
-    def apply_damage_once(self, villains, map_data, player, now_ms):
+    def apply_damage_once(self, villains, map_data, player, now_ms, occupancy=None):
         """
         Apply damage to villains in the beam's path. Each villain can only be hit once per beam.
         :param villains:
         :param map_data:
         :param player:
         :param now_ms:
+        :param occupancy: this frame's TileOccupancy of villains (optional)
         :return:
         """
         from scanner import _safe_cell  # avoid circular import at module import time
@@ -56,17 +76,17 @@ class FireBeam:
         pcell = _safe_cell(map_data, pcx, pcy)
         if pcell in NON_ELIGIBLE:
             return 0
-        covered = set(self.tiles)
-        for v in villains:
-            vcx, vcy = get_tile_position(v)
-            if (vcx, vcy) not in covered:
-                continue
-            vcell = _safe_cell(map_data, vcx, vcy)
-            if vcell in NON_ELIGIBLE:
+        if occupancy is None:
+            occupancy = TileOccupancy(villains)
+        hits = []
+        for vcx, vcy in self.tiles:
+            if _safe_cell(map_data, vcx, vcy) in NON_ELIGIBLE:
                 continue
-            was_disabled = v.is_disabled() if hasattr(v, "is_disabled") else False
+            hits.extend(occupancy.at(vcx, vcy))
+        for v in hits:
+            was_disabled = v.is_disabled(now_ms) if hasattr(v, "is_disabled") else False
             v.register_hit(now_ms)
-            is_disabled = v.is_disabled() if hasattr(v, "is_disabled") else False
+            is_disabled = v.is_disabled(now_ms) if hasattr(v, "is_disabled") else False
             if is_disabled and not was_disabled:
                 newly_disabled += 1
         return newly_disabled
@@ -82,8 +102,9 @@ class FireBeam:
         if elapsed >= BEAM_DURATION_MS:
             self._alpha = 0
         else:
-            # linear fade 255 -> 0
+            # linear fade 255 -> 0, quantised to the shared frame table
             self._alpha = int(255 * (1.0 - (elapsed / BEAM_DURATION_MS)))
+            self._frame = max(0, elapsed) * BEAM_ALPHA_STEPS // BEAM_DURATION_MS
 
 
     def is_dead(self):
@@ -94,18 +115,61 @@ class FireBeam:
         return self._alpha <= 0
 
 
-    def draw(self, surface, offset_y=0):
+    def draw(self, surface, offset_y=0, now_ms=None, offset_x=0):
         """
         Draw the beam onto the given surface with vertical offset.
         :param surface:
         :param offset_y:
+        :param now_ms: render time in ms; picks the fade frame between simulation steps (optional)
+        :param offset_x: horizontal offset (minus the camera x when scrolling)
         :return:
         """
         if self._alpha <= 0:
             return
-        img = self.sprite.copy()
-        img.set_alpha(self._alpha)
+        frame = self._frame
+        if now_ms is not None:
+            elapsed = max(0, now_ms - self.spawn_ms)
+            frame = min(BEAM_ALPHA_STEPS - 1, elapsed * BEAM_ALPHA_STEPS // BEAM_DURATION_MS)
+        img = self.frames[int(frame)]
         for cx, cy in self.tiles:
-            px = cx * TILE_SIZE
+            px = cx * TILE_SIZE + offset_x
             py = cy * TILE_SIZE + offset_y
             surface.blit(img, (px, py))
+
+
+class BeamPool:
+    """
+    Free list of dead beams, so rapid firing reuses FireBeam objects instead of allocating.
+    """
+    def __init__(self):
+        self._free = []
+        self.created = 0
+        self.reused = 0
+
+
+    def acquire(self, player, now_ms):
+        """
+        Return a beam started at the player's position, reusing a released one if available.
+        :param player:
+        :param now_ms:
+        :return:
+        """
+        if self._free:
+            self.reused += 1
+            beam = self._free.pop()
+            beam.reset(player, now_ms)
+            return beam
+        self.created += 1
+        return FireBeam(player, now_ms)
+
+
+    def release(self, beam):
+        """
+        Return a finished beam to the pool.
+        :param beam:
+        :return:
+        """
+        self._free.append(beam)
+
+
+beam_pool = BeamPool()
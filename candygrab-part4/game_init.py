@@ -8,7 +8,9 @@ from tilemap import build_tilemap
 from player import Player
 from scoredisplay import ScoreDisplay
 from villain import Villain
-from constants import SCREEN_WIDTH, SCREEN_HEIGHT, FPS
+from navigation import NavGraph
+from tilegrid import TileGrid
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, VILLAIN_AI, DEFAULT_VILLAIN_AI
 
 
 
@@ -51,6 +53,8 @@ def find_all_villain_spawns(map_data, char='V'):
     :param char:
     :return:
     """
+    if isinstance(map_data, TileGrid):
+        return [(x * 32, y * 32) for x, y, _ch in map_data.positions_of(char)]
     positions = []
     for y, row in enumerate(map_data):
         for x, val in enumerate(row):
@@ -59,19 +63,31 @@ def find_all_villain_spawns(map_data, char='V'):
     return positions
 
 
-def spawn_villains(map_data, speed_multiplier=1.0):
+def spawn_villains(map_data, speed_multiplier=1.0, nav=None, spawns=None, ai=DEFAULT_VILLAIN_AI):
     """
     Spawn villains at all designated spawn points in the map data.
     :param map_data:
+    :param speed_multiplier:
+    :param nav: NavGraph shared by the villains; built from map_data if not supplied
+    :param spawns: precompiled pixel spawn positions; the map is scanned for 'V' if not supplied
+    :param ai: villain AI strategy, one of VILLAIN_AI
     :return:
     """
-    spawns = find_all_villain_spawns(map_data, 'V')
+    if ai not in VILLAIN_AI:
+        raise ValueError(f"Unknown villain AI '{ai}' (expected one of {', '.join(VILLAIN_AI)})")
+    if ai != "nav":
+        nav = None
+    elif nav is None:
+        nav = NavGraph(map_data)
+    if spawns is None:
+        spawns = find_all_villain_spawns(map_data, 'V')
     total = len(spawns)
     villains = []
     for i, pos in enumerate(spawns):
         hue_shift = (i * 0.2) % 1.0
         villains.append(
-            Villain(map_data, pos, hue_shift=hue_shift, index=i, total=total, speed_multiplier=speed_multiplier))
+            Villain(map_data, pos, hue_shift=hue_shift, index=i, total=total, speed_multiplier=speed_multiplier,
+                    nav=nav, ai=ai))
     return villains
 
 
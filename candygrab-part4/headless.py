@@ -0,0 +1,215 @@
+# headless.py
+#
+# Deterministic, windowless simulation for soak tests, villain-AI regression checks and
+# ticks/sec measurements. Drives the same World.step() as the real game with an injected
+# clock, a seeded RNG and scripted input. Example:
+#   python headless.py --frames 20000 --seed 7 --all-levels
+
+
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import pygame
+import logger
+from constants import STEP_MS, VILLAIN_AI
+from movement import get_tile_position
+from world import World
+from profiler import FrameProfiler
+
+
+class ManualClock:
+    """
+    Injected game clock: time only moves when advance() is called.
+    """
+    def __init__(self, start_ms=0, step_ms=STEP_MS):
+        self.now_ms = start_ms
+        self.step_ms = step_ms
+
+    def advance(self):
+        """
+        Move the clock forward by one simulation step and return the new time in whole ms.
+        :return:
+        """
+        self.now_ms += self.step_ms
+        return int(self.now_ms)
+
+
+class ScriptedInput:
+    """
+    Replays a fixed list of (dx, dy, fire) frames, then repeats the last entry (or idles).
+    """
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.index = 0
+
+    def next(self, frame):
+        """
+        Return (dx, dy, fire) for the given frame number.
+        :param frame:
+        :return:
+        """
+        if self.index < len(self.frames):
+            self.index += 1
+            return self.frames[self.index - 1]
+        return self.frames[-1][:2] + (False,) if self.frames else (0, 0, False)
+
+
+class RandomInput:
+    """
+    Seeded "monkey" player: holds a random direction for a few frames and fires now and then.
+    """
+    MOVES = ((-1, 0), (1, 0), (0, -1), (0, 1), (0, 0))
+
+    def __init__(self, rng, hold_frames=30, fire_chance=0.02):
+        self.rng = rng
+        self.hold_frames = hold_frames
+        self.fire_chance = fire_chance
+        self._move = (0, 0)
+
+    def next(self, frame):
+        """
+        Return (dx, dy, fire) for the given frame number.
+        :param frame:
+        :return:
+        """
+        if frame % self.hold_frames == 0:
+            self._move = self.rng.choice(self.MOVES)
+        return self._move[0], self._move[1], self.rng.random() < self.fire_chance
+
+
+def init_headless():
+    """
+    Initialise pygame with dummy video/audio drivers so sprites can be converted without a window.
+    :return:
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.display.init()
+    pygame.font.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+
+
+def world_checksum(world):
+    """
+    Hash the positions and score so two runs can be compared frame-for-frame.
+    :param world:
+    :return:
+    """
+    h = hashlib.sha1()
+    h.update(f"{world.player.x:.3f},{world.player.y:.3f},{world.hud.score}".encode())
+    for v in world.villains:
+        h.update(f"{v.x:.3f},{v.y:.3f},{v.disabled_until}".encode())
+    return h.hexdigest()[:12]
+
+
+def run_headless(all_levels, level_index=0, frames=10000, seed=0, input_source=None,
+                 clock=None, advance_levels=True, profiler=None, villain_ai=None):
+    """
+    Run the simulation without a window and return a stats dict.
+    :param all_levels: level list from config/levels.json
+    :param level_index: level to start on
+    :param frames: number of fixed simulation steps (1 / SIM_HZ s each) to run
+    :param seed: seed for the RNG behind the default RandomInput
+    :param input_source: object with next(frame) -> (dx, dy, fire); defaults to RandomInput
+    :param clock: ManualClock (a fresh one is used if omitted)
+    :param advance_levels: load the next level when one is cleared (otherwise stop)
+    :param profiler: FrameProfiler timing World.step sections (optional)
+    :param villain_ai: villain AI strategy for every level (default: each level's own)
+    :return:
+    """
+    init_headless()
+    rng = random.Random(seed)
+    input_source = input_source or RandomInput(rng)
+    clock = clock or ManualClock()
+    world = World(all_levels, render=False, level_index=level_index, profiler=profiler, villain_ai=villain_ai)
+    deaths = 0
+    levels_cleared = 0
+    was_dying = False
+    frame = 0
+    start = time.perf_counter()
+    for frame in range(frames):
+        dx, dy, fire = input_source.next(frame)
+        now = clock.advance()
+        if profiler:
+            profiler.begin_frame()
+        complete = world.step(dx, dy, fire, now)
+        if profiler:
+            profiler.end_frame()
+        if complete:
+            levels_cleared += 1
+            if not advance_levels:
+                break
+            world.next_level()
+        dying = world.player.is_dying()
+        if dying and not was_dying:
+            deaths += 1
+        was_dying = dying
+    elapsed = time.perf_counter() - start
+    ran = frame + 1 if frames else 0
+    return {
+        "level": world.level.get("name", world.level.get("id")),
+        "frames": ran,
+        "seconds": elapsed,
+        "ticks_per_sec": ran / elapsed if elapsed > 0 else float("inf"),
+        "score": world.hud.score,
+        "deaths": deaths,
+        "levels_cleared": levels_cleared,
+        "candy_left": world.candy_index.count,
+        "villain_tiles": [get_tile_position(v) for v in world.villains],
+        "checksum": world_checksum(world),
+    }
+
+
+def define_args():
+    """
+    Define command line arguments for the headless runner.
+    :return:
+    """
+    parser = argparse.ArgumentParser(description="Run Candy Grab without a window.")
+    parser.add_argument("--config", default="config/levels.json", help="levels JSON file")
+    parser.add_argument("--level", type=int, default=0, help="level index to start on")
+    parser.add_argument("--all-levels", action="store_true", help="run every level in the config separately")
+    parser.add_argument("--frames", type=int, default=10000, help="simulation steps (1/SIM_HZ s each) per run")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed for the scripted input")
+    parser.add_argument("--villain-ai", choices=VILLAIN_AI, default=None,
+                        help="villain AI strategy (default: each level's villain_ai, else nav)")
+    parser.add_argument("--profile", action="store_true", help="print p50/p95/max ms per World.step section")
+    parser.add_argument("--profile-csv", default=None, help="write per-frame section times to this CSV")
+    return parser.parse_args()
+
+
+def main():
+    """
+    Run one or all levels headless and print a summary line per run.
+    :return:
+    """
+    args = define_args()
+    logger.configure(level="warning")
+    with open(args.config) as f:
+        all_levels = json.load(f)["levels"]
+    indices = range(len(all_levels)) if args.all_levels else [args.level]
+    for index in indices:
+        profiler = None
+        if args.profile or args.profile_csv:
+            profiler = FrameProfiler(window=args.frames, csv_path=args.profile_csv, overlay=False)
+        try:
+            stats = run_headless(all_levels, index, args.frames, args.seed, advance_levels=False,
+                                 profiler=profiler, villain_ai=args.villain_ai)
+        except OSError as e:
+            print(f"level {index}: skipped ({e})")
+            continue
+        print(f"level {index} ({stats['level']}): {stats['frames']} frames in {stats['seconds']:.2f}s "
+              f"= {stats['ticks_per_sec']:.0f} ticks/s | score {stats['score']} deaths {stats['deaths']} "
+              f"candy left {stats['candy_left']} | checksum {stats['checksum']}")
+        if profiler:
+            profiler.close()
+            for name, (p50, p95, mx) in profiler.summary().items():
+                print(f"  {name:<16} p50 {p50:.3f}  p95 {p95:.3f}  max {mx:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
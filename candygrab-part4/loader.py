@@ -1,15 +1,38 @@
 # loader.py
 
 
+import os
 import json
 import csv
-import pygame
-from spritesheet import load_spritesheet
-from visualeffects import hue_shift_sprite
-from tilemap import sheet_width
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import logger
+from atlas import get_hue_shifted
+from audio import audio
+from tilegrid import TileGrid
 from constants import *
 
 
+COMPILED_VERSION = 2
+COMPILED_MAGIC = b'CGLV'
+# magic, version, width, height, lookup/villain/candy counts, player spawn (px), map and lookup mtimes
+COMPILED_HEADER = struct.Struct('<4sHIIIIIii2d')
+COMPILED_LOOKUP = struct.Struct('<Bhhi')   # char, sheet x, sheet y, score
+COMPILED_VILLAIN = struct.Struct('<ii')    # spawn in pixels
+COMPILED_CANDY = struct.Struct('<iiB')     # tile x, tile y, char
+
+
+@dataclass
+class LevelSpawns:
+    """
+    Spawn and candy positions resolved ahead of time by compile_levels.py.
+    """
+    player: Tuple[int, int] = (0, 0)                               # pixels
+    villains: List[Tuple[int, int]] = field(default_factory=list)  # pixels
+    candy: Dict[Tuple[int, int], str] = field(default_factory=dict)  # tile -> char
+
+
 def load_level_data(json_path):
     """
     Load level data from a JSON file.
@@ -37,52 +60,135 @@ def load_tileset(csv_path):
         return tiles
 
 
-def load_map(path: str) -> list[list[str]]:
+def load_map(path: str) -> TileGrid:
     """
-    Load a text-based level map and ensure each row is exactly 25 characters wide.
-    Short rows are padded with spaces. Long rows are trimmed.
+    Load a text-based level map of any size. Every row is padded with spaces to the width of
+    the longest row (and to at least MIN_MAP_COLS characters).
     :param path: Path to the level text file
-    :return: 2D list of map characters
+    :return: TileGrid of map characters (indexable as map_data[y][x])
     """
     with open(path, 'r') as f:
-        lines = f.readlines()
-    padded_map = []
-    for line in lines:
-        row = list(line.rstrip('\n'))
-        row += [' '] * (25 - len(row))
-        padded_map.append(row[:25])  # truncate if over
-    return padded_map
+        rows = [list(line.rstrip('\n')) for line in f]
+    width = max([MIN_MAP_COLS] + [len(row) for row in rows])
+    return TileGrid([row + [' '] * (width - len(row)) for row in rows])
 
 
-def load_level(all_levels, index, music_volume):
+def compiled_path(level):
     """
-    Load level data, map, tileset, and handle music playback.
+    Path of the compiled file for a level: the "compiled" entry if set, else the map path with .lvl.
+    :param level:
+    :return:
+    """
+    return level.get("compiled") or os.path.splitext(level["map"])[0] + ".lvl"
+
+
+def _source_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def read_compiled_header(data):
+    """
+    Unpack and validate the header of a compiled level.
+    :param data: file contents
+    :return: header tuple, or None if this is not a current-format compiled level
+    """
+    if len(data) < COMPILED_HEADER.size:
+        return None
+    header = COMPILED_HEADER.unpack_from(data)
+    if header[0] != COMPILED_MAGIC or header[1] != COMPILED_VERSION:
+        return None
+    return header
+
+
+def load_compiled_level(level):
+    """
+    Load a level written by compile_levels.py. Returns None when there is no compiled file,
+    or when the map or tileset it was compiled from has changed since (so the text files are used).
+    :param level:
+    :return: (map_data, tile_lookup, LevelSpawns) or None
+    """
+    path = compiled_path(level)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    header = read_compiled_header(data)
+    if header is None:
+        logger.conlog("Ignoring %s: not a version %d compiled level", path, COMPILED_VERSION, level=logger.WARNING)
+        return None
+    _magic, _version, width, height, n_lookup, n_villains, n_candy, px, py, map_mtime, lookup_mtime = header
+    for source, stamp in ((level["map"], map_mtime), (level["lookup"], lookup_mtime)):
+        mtime = _source_mtime(source)
+        if mtime is not None and mtime != stamp:
+            logger.conlog("Ignoring stale %s: %s changed, rerun compile_levels.py", path, source,
+                          level=logger.WARNING)
+            return None
+    offset = COMPILED_HEADER.size
+    map_data = TileGrid.from_bytes(width, height, data[offset:offset + width * height])
+    offset += width * height
+    end = offset + n_lookup * COMPILED_LOOKUP.size
+    tile_lookup = {chr(ch): {'coords': (x, y), 'score': score}
+                   for ch, x, y, score in COMPILED_LOOKUP.iter_unpack(data[offset:end])}
+    offset, end = end, end + n_villains * COMPILED_VILLAIN.size
+    villains = list(COMPILED_VILLAIN.iter_unpack(data[offset:end]))
+    offset, end = end, end + n_candy * COMPILED_CANDY.size
+    candy = {(x, y): chr(ch) for x, y, ch in COMPILED_CANDY.iter_unpack(data[offset:end])}
+    return map_data, tile_lookup, LevelSpawns(player=(px, py), villains=villains, candy=candy)
+
+
+def prepare_level(all_levels, index, with_spawns=False):
+    """
+    Load a level's map and tileset and precompute its hue-shifted tiles. Touches no
+    audio or display state, so it is safe to run on the preloader's worker thread.
+    A compiled level from compile_levels.py is used when present and up to date.
     :param all_levels:
     :param index:
-    :param music_volume:
-    :return:
+    :param with_spawns: also return the precompiled LevelSpawns (None when loaded from text)
+    :return: (level, map_data, tile_lookup[, spawns])
     """
     level = all_levels[index]
-    map_data = load_map(level["map"])
-    tile_lookup = load_tileset(level["lookup"])
+    compiled = load_compiled_level(level)
+    if compiled:
+        map_data, tile_lookup, spawns = compiled
+    else:
+        map_data = load_map(level["map"])
+        tile_lookup = load_tileset(level["lookup"])
+        spawns = None
     hue_shift = level.get("floor_hue_shift", 0.0)
     if hue_shift:
-        tilesheet = load_spritesheet("assets/sprites/sheet.png")
-        sheet_cols = sheet_width() // TILE_SIZE
         for ch in {'F', 'T', 'L', 'E', 'U', 'B'}:
             entry = tile_lookup.get(ch)
             if entry and 'coords' in entry:
                 sx, sy = entry['coords']
-                tile_index = sy * sheet_cols + sx
-                original_tile = tilesheet[tile_index]
-                tile_lookup[ch]['surface'] = hue_shift_sprite(original_tile, hue_shift)
-    music_file = level.get("music")
-    if music_file:
-        try:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.load(music_file)
-            pygame.mixer.music.set_volume(music_volume)
-            pygame.mixer.music.play(-1)
-        except Exception as e:
-            print(f"Could not play music '{music_file}': {e}")
+                tile_lookup[ch]['surface'] = get_hue_shifted(sx, sy, hue_shift)
+    if with_spawns:
+        return level, map_data, tile_lookup, spawns
+    return level, map_data, tile_lookup
+
+
+def play_level_music(level, music_volume):
+    """
+    Start the level's music track, if it has one.
+    :param level:
+    :param music_volume: None skips music (e.g. headless runs)
+    :return:
+    """
+    if music_volume is not None:
+        audio.play_music(level.get("music"), music_volume)
+
+
+def load_level(all_levels, index, music_volume):
+    """
+    Load level data, map, tileset, and handle music playback.
+    :param all_levels:
+    :param index:
+    :param music_volume: None skips music (e.g. headless runs)
+    :return:
+    """
+    level, map_data, tile_lookup = prepare_level(all_levels, index)
+    play_level_music(level, music_volume)
     return level, map_data, tile_lookup
@@ -1,28 +1,204 @@
 # logger.py
+#
+# Level/category gated console logger. Messages use lazy %-formatting:
+#   conlog("%s moved to (%d,%d)", name, x, y, level=DEBUG, category="villain")
+# Nothing is formatted or timestamped unless the message passes the gate, so a disabled
+# call costs a single threshold comparison. Hot paths with expensive arguments can guard
+# with log_enabled(category, level) first.
+#
+# CANDYGRAB_LOG configures the gate at startup, e.g. "info", "debug" or
+# "warning,villain=debug,movement=debug,scanner=off".
 
 
+import os
+import sys
+import time
+from collections import deque
 from datetime import datetime
 
 
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+_LEVEL_NAMES = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR, "off": OFF}
+
+GENERAL = "general"
+
+RING_SIZE = 1024
+
 _last_message = None
 _repeat_count = 0
 _enable_logging = True
+_default_level = INFO
+_category_levels = {}
+_thresholds = {}            # effective per-category thresholds, rebuilt by _refresh()
+_default_threshold = INFO
+_console = True
+_ring = deque(maxlen=RING_SIZE)
+
+
+def _refresh():
+    """
+    Recompute the effective thresholds after any configuration change.
+    :return:
+    """
+    global _default_threshold, _thresholds
+    if not _enable_logging:
+        _default_threshold = OFF
+        _thresholds = {}
+        return
+    _default_threshold = _default_level
+    _thresholds = dict(_category_levels)
+
+
+def _parse_level(value):
+    """
+    Accept a level number or name ("debug", "info", ...).
+    :param value:
+    :return:
+    """
+    if isinstance(value, int):
+        return value
+    value = str(value).strip().lower()
+    if value.isdigit():
+        return int(value)
+    return _LEVEL_NAMES[value]
+
+
+def configure(level=None, categories=None, console=None, ring_size=None, enabled=None):
+    """
+    Configure the logger.
+    :param level: default minimum level for all categories
+    :param categories: {category: level} overrides (use OFF to silence a category)
+    :param console: print passing messages to stdout (they always go to the ring buffer)
+    :param ring_size: number of records kept for dump_ring()
+    :param enabled: master switch
+    :return:
+    """
+    global _default_level, _console, _ring, _enable_logging
+    if level is not None:
+        _default_level = _parse_level(level)
+    if categories:
+        for category, cat_level in categories.items():
+            _category_levels[category] = _parse_level(cat_level)
+    if console is not None:
+        _console = console
+    if ring_size is not None:
+        _ring = deque(_ring, maxlen=ring_size)
+    if enabled is not None:
+        _enable_logging = enabled
+    _refresh()
+
+
+def configure_from_env(var="CANDYGRAB_LOG"):
+    """
+    Apply a spec such as "warning,villain=debug,scanner=off" from an environment variable.
+    Runs at import time, so unknown level names are reported on stderr and skipped.
+    :param var:
+    :return:
+    """
+    spec = os.getenv(var)
+    if not spec:
+        return
+    level = None
+    categories = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        category, _, value = part.rpartition("=")
+        try:
+            parsed = _parse_level(value)
+        except KeyError:
+            print(f"{var}: unknown log level '{value.strip()}' in '{part}', ignoring it "
+                  f"(expected a number or one of {', '.join(_LEVEL_NAMES)})", file=sys.stderr)
+            continue
+        if category:
+            categories[category.strip()] = parsed
+        else:
+            level = parsed
+    configure(level=level, categories=categories)
+
+
+def enable(category, level=DEBUG):
+    """
+    Turn on a category down to the given level.
+    :param category:
+    :param level:
+    :return:
+    """
+    configure(categories={category: level})
+
+
+def disable(category):
+    """
+    Silence a category entirely.
+    :param category:
+    :return:
+    """
+    configure(categories={category: OFF})
 
 
-def conlog(message):
+def log_enabled(category=GENERAL, level=DEBUG):
+    """
+    Check whether a message of this level/category would be logged.
+    :param category:
+    :param level:
+    :return:
+    """
+    return level >= _thresholds.get(category, _default_threshold)
+
+
+def conlog(message, *args, level=INFO, category=GENERAL):
     """
     Log a message to the console with a timestamp.
-    :param message:
-    :return:
-    """
-    if _enable_logging:
-        global _last_message, _repeat_count
-        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        if message == _last_message:
-            _repeat_count += 1
-            return
-        if _repeat_count > 0:
-            print(f"{now} Previous message repeated {_repeat_count} times")
-            _repeat_count = 0
-        print(f"{now} {message}")
-        _last_message = message
\ No newline at end of file
+    :param message: text, or a %-format string when args are given
+    :param args: lazily applied to message only if it passes the gate
+    :param level:
+    :param category:
+    :return:
+    """
+    if level < _thresholds.get(category, _default_threshold):
+        return
+    global _last_message, _repeat_count
+    if args:
+        message = message % args
+    stamp = time.time()
+    _ring.append((stamp, level, category, message))
+    if not _console:
+        return
+    if message == _last_message:
+        _repeat_count += 1
+        return
+    now = datetime.fromtimestamp(stamp).strftime('%Y-%m-%d %H:%M:%S')
+    if _repeat_count > 0:
+        print(f"{now} Previous message repeated {_repeat_count} times")
+        _repeat_count = 0
+    print(f"{now} {message}")
+    _last_message = message
+
+
+def dump_ring(stream=None):
+    """
+    Write every buffered record (oldest first) to stream (stdout by default).
+    :param stream:
+    :return:
+    """
+    stream = stream or sys.stdout
+    names = {v: k.upper() for k, v in _LEVEL_NAMES.items()}
+    for stamp, level, category, message in list(_ring):
+        now = datetime.fromtimestamp(stamp).strftime('%H:%M:%S') + f".{int(stamp * 1000) % 1000:03d}"
+        stream.write(f"{now} {names.get(level, level)} [{category}] {message}\n")
+
+
+def clear_ring():
+    """
+    Drop all buffered records.
+    :return:
+    """
+    _ring.clear()
+
+
+configure_from_env()
@@ -5,15 +5,16 @@ import os
 import json
 import pygame
 from constants import *
-from loader import load_level, TILE_SIZE
-from tilemap import build_tilemap, sheet_width
 from scoredisplay import ScoreDisplay
-from player import Player
-from display import render_frame, update_villains, update_beams, show_level_complete, show_title_card
-from scanner import scan_world
-from combat import handle_firing, check_and_trigger_player_death
+from display import render_frame, show_level_complete, show_title_card
 from input import get_movement_input
-from game_init import setup_screen, HUDState, spawn_villains, SCREEN_WIDTH, FPS
+from game_init import setup_screen, SCREEN_WIDTH, FPS
+from world import World
+from preloader import LevelPreloader
+from profiler import profiler_from_env
+from timestep import FixedTimestep, lerp_position
+from replay import recorder_from_env
+from audio import audio, TITLE_MUSIC, LEVEL_COMPLETE_MUSIC
 
 
 def handle_events():
@@ -33,7 +34,8 @@ def handle_events():
 
 def run_game_loop(screen, clock, all_levels, candy_sound, music_volume):
     """
-    Main game loop: handle input, update game state, render frame, manage levels.
+    Main game loop: handle input, run fixed SIM_HZ simulation steps for the elapsed time,
+    render an interpolated frame, manage levels.
     :param screen:
     :param clock:
     :param all_levels:
@@ -41,44 +43,42 @@ def run_game_loop(screen, clock, all_levels, candy_sound, music_volume):
     :param music_volume:
     :return:
     """
-    current_level_index = 0
-    loop_count = 0
-    level, map_data, tile_lookup = load_level(all_levels, current_level_index, music_volume)
-    tile_surface = build_tilemap(map_data, tile_lookup)
-    player = Player(map_data)
+    preloader = LevelPreloader(all_levels)
+    profiler = profiler_from_env()
+    timestep = FixedTimestep(start_ms=pygame.time.get_ticks())
+    recorder = recorder_from_env(0, timestep.now_ms)
+    world = World(all_levels, music_volume=music_volume, candy_sound=candy_sound, preloader=preloader,
+                  profiler=profiler)
     score_display = ScoreDisplay(SCREEN_WIDTH)
-    hud = HUDState()
-    hud.level_number = level["id"]
-    villains = spawn_villains(map_data)
-    beams = []
+    elapsed_ms = 0
+    fire_pressed = False  # latched until a simulation step uses it (a frame may run 0 steps)
     while True:
-        fire_pressed = handle_events()
-        keys = pygame.key.get_pressed()
-        now = pygame.time.get_ticks()
+        profiler.begin_frame()
+        with profiler.section("handle_events"):
+            fire_pressed = handle_events() or fire_pressed
+            keys = pygame.key.get_pressed()
         dx, dy = get_movement_input(keys)
-        player.update(dx, dy, map_data, now_ms=now)
-        update_villains(villains, player, map_data)
-        if fire_pressed:
-            handle_firing(player, map_data, villains, beams, now, hud)
-        update_beams(beams, now)
-        check_and_trigger_player_death(player, villains, map_data, now)
-        scan_world(map_data, player, villains, tile_lookup, hud, candy_sound=candy_sound)
-        if not any(ch in row for row in map_data for ch in {'@', '!', '#', '$'}):
-            show_level_complete(screen, hud.level_number, hud.lives, music_volume)
-            current_level_index += 1
-            if current_level_index >= len(all_levels):
-                current_level_index = 0
-                loop_count += 1
-            speed_multiplier = 1.0 + 0.15 * loop_count
-            level, map_data, tile_lookup = load_level(all_levels, current_level_index, music_volume)
-            tile_surface = build_tilemap(map_data, tile_lookup)
-            player = Player(map_data)
-            villains = spawn_villains(map_data, speed_multiplier=speed_multiplier)
-            beams.clear()
-            hud.level_number = level["id"] + loop_count * len(all_levels)
-        tile_surface = build_tilemap(map_data, tile_lookup)
-        render_frame(screen, tile_surface, player, villains, score_display, hud, beams)
-        clock.tick(FPS)
+        for _ in range(timestep.advance(elapsed_ms)):
+            if recorder:
+                recorder.record(dx, dy, fire_pressed)
+            level_done = world.step(dx, dy, fire_pressed, timestep.tick())
+            fire_pressed = False
+            if level_done:
+                show_level_complete(screen, world.hud.level_number, world.hud.lives, music_volume)
+                world.next_level()
+                clock.tick()  # restart frame timing after the blocking screen
+                timestep.reset()
+                profiler.begin_frame()  # don't count the level-complete screen
+                break
+        with profiler.section("tilemap.refresh"):
+            world.tile_map.refresh()
+        world.camera.follow(*lerp_position(world.player, timestep.alpha))
+        with profiler.section("render_frame"):
+            render_frame(screen, world.tile_map, world.player, world.villains, score_display, world.hud, world.beams,
+                         profiler=profiler if profiler.enabled else None, alpha=timestep.alpha,
+                         now_ms=timestep.render_ms(), camera=world.camera)
+        profiler.end_frame()
+        elapsed_ms = clock.tick(FPS)
 
 
 def main():
@@ -88,8 +88,10 @@ def main():
     """
     pygame.mixer.init()
     music_volume = float(os.getenv("MUSIC_VOLUME", "0.25"))
-    candy_sound = pygame.mixer.Sound("assets/sounds/grab-candy.wav")
-    candy_sound.set_volume(0.5)
+    audio.preload()
+    audio.prefetch_music(TITLE_MUSIC)
+    audio.prefetch_music(LEVEL_COMPLETE_MUSIC)
+    candy_sound = audio.sound("candy")
     with open("config/levels.json") as f:
         all_levels = json.load(f)["levels"]
     screen, clock = setup_screen()
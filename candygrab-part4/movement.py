@@ -1,8 +1,12 @@
 # movement.py
 
 
-from logger import conlog
-from constants import TILE_SIZE
+from logger import conlog, DEBUG
+from constants import TILE_SIZE, SNAP_TICKS, STEP_SCALE
+from tilegrid import neighbourhood, LADDER
+
+
+NEIGHBOUR_KEYS = ('upleft', 'upcen', 'upright', 'left', 'center', 'right', 'loleft', 'locen', 'loright')
 
 
 def get_tile_position(entity):
@@ -42,10 +46,11 @@ def try_move(entity, dx, dy, map_data):
     :param map_data:
     :return:
     """
-    force_up = 1  # pixels to nudge upward if standing in a floor
-    tiles = get_surrounding_tiles(entity, map_data)
-    if tiles['center'] == 'F':
-        conlog(f"[{entity.name}] Standing on floor, nudging up by {force_up} pixels")
+    force_up = STEP_SCALE  # pixels per step to nudge upward if standing in a floor (1 per 60 Hz frame)
+    tiles = neighbourhood(map_data, *get_tile_position(entity))
+    if tiles[4] == 'F':  # center
+        conlog("[%s] Standing on floor, nudging up by %.2f pixels", entity.name, force_up,
+               level=DEBUG, category="movement")
         entity.y -= force_up
         return True
     if dx == 0 and dy == 0:
@@ -54,8 +59,8 @@ def try_move(entity, dx, dy, map_data):
     if new_x < 0:
         # conlog(f"[{entity.name}] Aborting move: new_x < 0")
         return False
-    if new_x > 768:
-        # conlog(f"[{entity.name}] Aborting move: new_x > 768")
+    if new_x > (len(map_data[0]) - 1) * TILE_SIZE:
+        # conlog(f"[{entity.name}] Aborting move: past the right edge")
         return False
     # Prevent vertical movement unless horizontally aligned with tile edge
     if dy != 0:
@@ -65,9 +70,9 @@ def try_move(entity, dx, dy, map_data):
             return False
     if not in_bounds(tx, ty, map_data):
         return False
-    if blocks_lateral(entity, dx, map_data, tx, ty, cx, cy):
+    if blocks_lateral(entity, dx, map_data, tx, ty, cx, cy, tiles):
         return False
-    if blocks_downward(entity, dx, map_data):
+    if blocks_downward(entity, dx, map_data, tiles):
         return False
     if blocks_upward(entity, dy, map_data, tx, ty):
         return False
@@ -87,7 +92,7 @@ def in_bounds(tx, ty, map_data):
     return 0 <= ty < len(map_data) and 0 <= tx < len(map_data[0])
 
 
-def blocks_lateral(caller, dx, map_data, tx, ty, cx, cy):
+def blocks_lateral(caller, dx, map_data, tx, ty, cx, cy, tiles=None):
     """
     Check if the movement in the specified direction is blocked by a wall or obstacle.
     :param caller:
@@ -97,12 +102,13 @@ def blocks_lateral(caller, dx, map_data, tx, ty, cx, cy):
     :param ty:
     :param cx:
     :param cy:
+    :param tiles: precomputed 9-char neighbourhood of (cx, cy), if the caller already has it
     :return:
     """
-    upleft, upcen, upright, left, center, right, loleft, locen, loright = (
-        get_surrounding_tiles(caller, map_data).values())
     if dx == 0:
         return False
+    upleft, upcen, upright, left, center, right, loleft, locen, loright = (
+        tiles or neighbourhood(map_data, cx, cy))
     if center in ['L']:
         return True
     if caller.name == "Player" and entity_is_tile_aligned_horizontally(caller):
@@ -118,10 +124,10 @@ def blocks_lateral(caller, dx, map_data, tx, ty, cx, cy):
     if entity_is_tile_aligned_horizontally(caller):
         if caller.name != "Player":
             if dx == -1 and left in ['B']:
-                conlog(f"[{caller.name}] Blocked: target left is B")
+                conlog("[%s] Blocked: target left is B", caller.name, level=DEBUG, category="movement")
                 return True
             if dx == 1 and right in ['B']:
-                conlog(f"[{caller.name}] Blocked: target right is B")
+                conlog("[%s] Blocked: target right is B", caller.name, level=DEBUG, category="movement")
                 return True
     if center in ['T']:
         return True
@@ -133,18 +139,19 @@ def blocks_lateral(caller, dx, map_data, tx, ty, cx, cy):
     return False
 
 
-def blocks_downward(entity, dy, map_data):
+def blocks_downward(entity, dy, map_data, tiles=None):
     """
     Check if the downward movement is blocked by a wall or obstacle.
     :param entity:
     :param dy:
     :param map_data:
+    :param tiles: precomputed 9-char neighbourhood of the entity's tile (optional)
     :return:
     """
     if dy <= 0:
         return False
-    tiles = get_surrounding_tiles(entity, map_data)
-    return tiles['center'] not in ['D', 'E'] and tiles['locen'] not in ['L', 'E', 'U', 'F']
+    tiles = tiles or neighbourhood(map_data, *get_tile_position(entity))
+    return tiles[4] not in 'DE' and tiles[7] not in 'LEUF'  # center, locen
 
 
 def blocks_upward(caller, dy, map_data, tx, ty):
@@ -174,6 +181,8 @@ def on_ladder(entity, map_data):
     """
     cx = int(entity.x // TILE_SIZE)
     cy = int(entity.y // TILE_SIZE)
+    if hasattr(map_data, 'has'):
+        return map_data.has(cx, cy, LADDER)
     return map_data[cy][cx] in ['L', 'U', 'D', 'E', 'T']
 
 
@@ -185,8 +194,8 @@ def valid_floor_below(entity, map_data):
     :return:
     """
     # log_surrounding_tiles(entity, map_data)
-    tiles = get_surrounding_tiles(entity, map_data)
-    return tiles['loleft'] == 'F' or tiles['loright'] == 'F'
+    tiles = neighbourhood(map_data, *get_tile_position(entity))
+    return tiles[6] == 'F' or tiles[8] == 'F'  # loleft, loright
 
 
 def can_climb(direction, map_data, cx, cy):
@@ -213,38 +222,21 @@ def log_surrounding_tiles(entity, map_data):
     """
     tiles = get_surrounding_tiles(entity, map_data)
     cx, cy = get_tile_position(entity)
-    conlog(f"{entity.name} [TILES] ↖{tiles['upleft']} ↑{tiles['upcen']} ↗{tiles['upright']}")
-    conlog(f"{entity.name} [TILES] ←{tiles['left']} -{tiles['center']} →{tiles['right']}")
-    conlog(f"{entity.name} [TILES] ↙{tiles['loleft']} ↓{tiles['locen']} ↘{tiles['loright']}")
-    conlog(f"{entity.name} POS=({entity.x:.1f},{entity.y:.1f}) TILE=({cx},{cy})")
+    conlog(f"{entity.name} [TILES] ↖{tiles['upleft']} ↑{tiles['upcen']} ↗{tiles['upright']}", category="movement")
+    conlog(f"{entity.name} [TILES] ←{tiles['left']} -{tiles['center']} →{tiles['right']}", category="movement")
+    conlog(f"{entity.name} [TILES] ↙{tiles['loleft']} ↓{tiles['locen']} ↘{tiles['loright']}", category="movement")
+    conlog(f"{entity.name} POS=({entity.x:.1f},{entity.y:.1f}) TILE=({cx},{cy})", category="movement")
 
 
 def get_surrounding_tiles(entity, map_data):
     """
-    Get the surrounding tiles of the entity based on its current position.
+    Get the surrounding tiles of the entity based on its current position, keyed by
+    NEIGHBOUR_KEYS. Hot paths should unpack neighbourhood() directly instead.
     :param entity:
     :param map_data:
     :return:
     """
-    cx, cy = get_tile_position(entity)
-    def safe_get(x, y):
-        try:
-            return map_data[y][x]
-        except IndexError as e:
-            # Trap the troublemaker and log it
-            # conlog(f"IndexError at safe_get({x},{y}): {e}")
-            return '~'  # out-of-bounds marker
-    return {
-        'upleft':  safe_get(cx - 1, cy - 1),
-        'upcen':   safe_get(cx,     cy - 1),
-        'upright': safe_get(cx + 1, cy - 1),
-        'left':    safe_get(cx - 1, cy),
-        'center':  safe_get(cx,     cy),
-        'right':   safe_get(cx + 1, cy),
-        'loleft':  safe_get(cx - 1, cy + 1),
-        'locen':  safe_get(cx,     cy + 1),
-        'loright':safe_get(cx + 1, cy + 1)
-    }
+    return dict(zip(NEIGHBOUR_KEYS, neighbourhood(map_data, *get_tile_position(entity))))
 
 
 def maybe_snap_to_floor(entity, map_data):
@@ -254,11 +246,11 @@ def maybe_snap_to_floor(entity, map_data):
     :param map_data:
     :return:
     """
-    if entity.timer % 120 != 0:
+    if entity.timer % SNAP_TICKS != 0:
         return
     cx, cy = get_tile_position(entity)
-    tiles = get_surrounding_tiles(entity, map_data)
-    if tiles['center'] == ' ' and tiles['locen'] == 'F':
+    tiles = neighbourhood(map_data, cx, cy)
+    if tiles[4] == ' ' and tiles[7] == 'F':  # center, locen
         snap_x = cx * TILE_SIZE
         snap_y = cy * TILE_SIZE
         if int(entity.x) != snap_x or int(entity.y) != snap_y:
@@ -278,6 +270,6 @@ def entity_is_tile_aligned_horizontally(entity):
 
 def entity_is_tile_aligned_vertically(entity):
     remainder = entity.y % TILE_SIZE
-    conlog(f"remainder={remainder}")
+    conlog("remainder=%s", remainder, level=DEBUG, category="movement")
     # return remainder <= 3 or remainder >= (TILE_SIZE - 3)
     return remainder <= 3
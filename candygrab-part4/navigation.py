@@ -0,0 +1,131 @@
+# navigation.py
+
+
+from collections import deque
+
+
+# Tile semantics mirrored from movement.py
+FLOOR_TILES = {'F', 'T'}                   # something to stand on
+BLOCKING_TILES = {'F', 'B', 'T', 'L'}      # cannot be walked through horizontally
+LADDER_TILES = {'L', 'U', 'D', 'E', 'T'}
+CLIMB_DOWN_FROM = {'D', 'E', 'L', 'T'}
+CLIMB_UP_FROM = {'U', 'E', 'L', 'T'}
+CLIMB_DOWN_INTO = {'L', 'U', 'E', 'T'}
+
+
+class NavGraph:
+    """
+    Walkable-tile graph for one level, built once from map_data.
+    Nodes are tiles a villain can occupy; edges are single-tile moves that try_move allows
+    (walking along a floor, climbing a ladder). A BFS distance field towards the player's
+    tile is shared by every villain and only recomputed when the player changes tile.
+    """
+    def __init__(self, map_data):
+        self.height = len(map_data)
+        self.width = len(map_data[0]) if self.height else 0
+        self.edges = {}      # node -> list of (dx, dy) moves out of it
+        self.incoming = {}   # node -> list of nodes that can step into it
+        self._field_target = None
+        self._field = {}
+        self.field_builds = 0
+        self._build(map_data)
+
+
+    def _cell(self, map_data, x, y):
+        """
+        Return map_data[y][x], or '~' when out of bounds.
+        :param map_data:
+        :param x:
+        :param y:
+        :return:
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return map_data[y][x]
+        return '~'
+
+
+    def _build(self, map_data):
+        """
+        Populate the edge lists from the map.
+        :param map_data:
+        :return:
+        """
+        cell = lambda x, y: self._cell(map_data, x, y)
+        walk = set()
+        for y in range(self.height):
+            for x in range(self.width):
+                if cell(x, y) not in BLOCKING_TILES and cell(x, y + 1) in FLOOR_TILES:
+                    walk.add((x, y))
+        for y in range(self.height):
+            for x in range(self.width):
+                here = cell(x, y)
+                moves = []
+                if (x, y) in walk:
+                    for dx in (-1, 1):
+                        if (x + dx, y) in walk:
+                            moves.append((dx, 0))
+                below = cell(x, y + 1)
+                if here in CLIMB_DOWN_FROM and below in CLIMB_DOWN_INTO and \
+                        (here in {'D', 'E'} or below in {'L', 'E', 'U'}):
+                    moves.append((0, 1))
+                if here in CLIMB_UP_FROM and cell(x, y - 1) in LADDER_TILES:
+                    moves.append((0, -1))
+                if moves or (x, y) in walk:
+                    self.edges[(x, y)] = moves
+                for dx, dy in moves:
+                    self.incoming.setdefault((x + dx, y + dy), []).append((x, y))
+        for node in list(self.incoming):
+            self.edges.setdefault(node, [])
+
+
+    def __contains__(self, node):
+        return node in self.edges
+
+
+    def distance_field(self, target):
+        """
+        Return {node: steps to reach target}, reusing the cached field if the target is unchanged.
+        :param target: (x, y) tile
+        :return:
+        """
+        if target == self._field_target:
+            return self._field
+        field = {}
+        if target in self.edges:
+            field[target] = 0
+            queue = deque([target])
+            while queue:
+                node = queue.popleft()
+                d = field[node] + 1
+                for prev in self.incoming.get(node, ()):
+                    if prev not in field:
+                        field[prev] = d
+                        queue.append(prev)
+        self._field_target = target
+        self._field = field
+        self.field_builds += 1
+        return field
+
+
+    def next_step(self, node, target, prefer=(0, 0)):
+        """
+        Return the (dx, dy) move from node that follows a shortest path to target,
+        or None if there is no path (or node already is the target).
+        :param node: current (x, y) tile
+        :param target: goal (x, y) tile
+        :param prefer: move to choose when several are equally short (e.g. last direction)
+        :return:
+        """
+        field = self.distance_field(target)
+        dist = field.get(node)
+        if not dist:
+            return None
+        x, y = node
+        best = None
+        for move in self.edges.get(node, ()):
+            if field.get((x + move[0], y + move[1])) == dist - 1:
+                if move == prefer:
+                    return move
+                if best is None:
+                    best = move
+        return best
@@ -0,0 +1,59 @@
+# occupancy.py
+
+
+from movement import get_tile_position
+
+
+_EMPTY = ()
+
+
+class TileOccupancy:
+    """
+    Per-frame spatial hash of which entities stand on which tile.
+    Rebuilt once per frame (after villains move) and shared by combat, firing and the scanner,
+    so each "who is on tile (x, y)?" query is a single dict lookup.
+    """
+    def __init__(self, entities=()):
+        self.cells = {}
+        self.rebuild(entities)
+
+
+    def rebuild(self, entities):
+        """
+        Recompute the tile -> entities mapping for the given entities.
+        :param entities:
+        :return:
+        """
+        cells = {}
+        for e in entities:
+            tile = get_tile_position(e)
+            bucket = cells.get(tile)
+            if bucket is None:
+                cells[tile] = [e]
+            else:
+                bucket.append(e)
+        self.cells = cells
+        return self
+
+
+    def at(self, cx, cy):
+        """
+        Return the entities on tile (cx, cy) (an empty tuple if none).
+        :param cx:
+        :param cy:
+        :return:
+        """
+        return self.cells.get((cx, cy), _EMPTY)
+
+
+    def in_row(self, cy, x_from, x_to):
+        """
+        Yield (cx, entity) for every entity on row cy with x_from <= cx <= x_to.
+        :param cy:
+        :param x_from:
+        :param x_to:
+        :return:
+        """
+        for cx in range(x_from, x_to + 1):
+            for e in self.cells.get((cx, cy), _EMPTY):
+                yield cx, e
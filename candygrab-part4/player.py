@@ -1,8 +1,9 @@
 # player.py
 
-import pygame
-from logger import conlog
-from constants import DEATH_ANIM_MS, DEATH_COOLDOWN_MS, TILE_SIZE
+from logger import conlog, DEBUG
+from constants import DEATH_ANIM_MS, DEATH_COOLDOWN_MS, DEATH_SPIN_STEPS, TILE_SIZE, STEP_SCALE, ANIM_TICKS
+from atlas import get_tile, get_spin_frames
+from timestep import lerp_position
 from movement import (
     get_tile_position,
     get_target_tile,
@@ -13,12 +14,16 @@ from movement import (
 
 
 class Player:
-    def __init__(self, map_data):
+    def __init__(self, map_data, spawn=None):
         self.sprites = self.load_player_sprites()
-        self.MOVE_SPEED = 2
+        # spin_frames[facing_left][frame][step]: both facings, pre-rotated for the death spin
+        self.spin_frames = [[get_spin_frames(sprite, DEATH_SPIN_STEPS, flip) for sprite in self.sprites]
+                            for flip in (False, True)]
+        self.MOVE_SPEED = 2 * STEP_SCALE  # pixels per simulation step
         self.frame = 0
         self.timer = 0
-        self.x, self.y = self.find_spawn(map_data)
+        self.x, self.y = spawn if spawn is not None else self.find_spawn(map_data)
+        self.prev_x, self.prev_y = self.x, self.y  # position at the start of the last step
         self.facing_left = False
         self.name = "Player"
         # death state
@@ -32,8 +37,7 @@ class Player:
         Load player sprites from the spritesheet.
         :return:
         """
-        sheet = pygame.image.load("assets/sprites/sheet.png").convert_alpha()
-        return [sheet.subsurface(pygame.Rect(i * TILE_SIZE, 0, TILE_SIZE, TILE_SIZE)) for i in range(4)]
+        return [get_tile(i, 0) for i in range(4)]
 
 
     def find_spawn(self, map_data):
@@ -106,7 +110,7 @@ class Player:
         """
         self.timer += 1
         maybe_snap_to_floor(self, map_data)
-        if self.timer % 10 == 0:
+        if self.timer % ANIM_TICKS == 0:
             self.frame = (self.frame + 1) % len(self.sprites)
         # Death animation overrides control
         if self.is_dying():
@@ -119,23 +123,27 @@ class Player:
             self.facing_left = False
         _nx, _ny, _tx, _ty, _cx, _cy = get_target_tile(self, dx, dy)
         # log_surrounding_tiles(self, map_data)
-        conlog("Player trying move")
+        conlog("Player trying move", level=DEBUG, category="player")
         try_move(self, dx, dy, map_data)
 
 
-    def draw(self, surface, offset_y=0):
+    def draw(self, surface, offset_y=0, alpha=1.0, offset_x=0):
         """
         Draw the player onto the given surface with vertical offset.
         :param surface:
         :param offset_y:
+        :param alpha: interpolation between the previous and current step (0.0-1.0)
+        :param offset_x: horizontal offset (minus the camera x when scrolling)
         :return:
         """
-        base = self.sprites[self.frame]
-        sprite = pygame.transform.flip(base, True, False) if self.facing_left else base
+        x, y = lerp_position(self, alpha)
+        x += offset_x
+        frames = self.spin_frames[self.facing_left][self.frame]
         if self.is_dying():
-            # rotate around center while spinning
-            rotated = pygame.transform.rotate(sprite, -self.spin_angle)  # negative for clockwise
-            rect = rotated.get_rect(center=(self.x + TILE_SIZE // 2, self.y + offset_y + TILE_SIZE // 2))
+            # rotate around center while spinning, using the nearest pre-rotated step
+            step = int(round(self.spin_angle * DEATH_SPIN_STEPS / 360.0)) % DEATH_SPIN_STEPS
+            rotated = frames[step]
+            rect = rotated.get_rect(center=(x + TILE_SIZE // 2, y + offset_y + TILE_SIZE // 2))
             surface.blit(rotated, rect.topleft)
         else:
-            surface.blit(sprite, (self.x, self.y + offset_y))
+            surface.blit(frames[0], (x, y + offset_y))
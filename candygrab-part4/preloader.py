@@ -0,0 +1,142 @@
+# preloader.py
+#
+# Prepares levels ahead of time on a single worker thread: map parsing, TileGrid build,
+# hue-shifted tiles, the drawn tilemap surface and (for the "nav" villain AI) the navigation
+# graph. Prepared levels
+# are kept in a small LRU so looping back to the first level costs nothing.
+
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import logger
+from loader import prepare_level
+from tilemap import TileMapSurface, make_tile_map, is_large_map
+from navigation import NavGraph
+from constants import DEFAULT_VILLAIN_AI
+
+
+class PreparedLevel:
+    """
+    Everything about a level that can be built before it is played. The map and surface are
+    kept pristine; instantiate() hands out copies that the game is free to modify.
+    """
+    def __init__(self, index, level, map_data, tile_lookup, surface, nav, spawns=None):
+        self.index = index
+        self.spawns = spawns  # LevelSpawns from a compiled level, else None
+        self.level = level
+        self.map_data = map_data
+        self.tile_lookup = tile_lookup
+        self.surface = surface
+        self.nav = nav
+
+
+    def instantiate(self, render=True):
+        """
+        Return a playable (map_data, tile_map) pair backed by copies of the pristine data.
+        :param render: build a TileMapSurface (False for headless runs)
+        :return:
+        """
+        map_data = self.map_data.copy()
+        tile_map = None
+        if render:
+            tile_map = make_tile_map(map_data, self.tile_lookup, surface=self.surface)
+        return map_data, tile_map
+
+
+def build_prepared_level(all_levels, index, render=True, villain_ai=None):
+    """
+    Do all the per-level work that does not depend on game state.
+    :param all_levels:
+    :param index:
+    :param render: also draw the tilemap surface
+    :param villain_ai: villain AI override (default: the level's "villain_ai"); the NavGraph
+                       is only built for "nav"
+    :return:
+    """
+    level, map_data, tile_lookup, spawns = prepare_level(all_levels, index, with_spawns=True)
+    # large maps are drawn in chunks as they scroll into view, so there is nothing to pre-draw
+    surface = TileMapSurface(map_data, tile_lookup).surface if render and not is_large_map(map_data) else None
+    ai = villain_ai or level.get("villain_ai", DEFAULT_VILLAIN_AI)
+    nav = NavGraph(map_data) if ai == "nav" else None
+    return PreparedLevel(index, level, map_data, tile_lookup, surface, nav, spawns)
+
+
+class LevelPreloader:
+    """
+    Background level preparation plus an LRU of prepared levels.
+    """
+    def __init__(self, all_levels, capacity=4, render=True, villain_ai=None):
+        self.all_levels = all_levels
+        self.capacity = capacity
+        self.render = render
+        self.villain_ai = villain_ai  # same override as World(villain_ai=...)
+        self._cache = OrderedDict()   # index -> PreparedLevel, most recently used last
+        self._pending = {}            # index -> Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preload")
+        self.hits = 0
+        self.misses = 0
+
+
+    def _store(self, prepared):
+        """
+        Add a prepared level to the LRU, evicting the least recently used entry if full.
+        :param prepared:
+        :return:
+        """
+        self._cache[prepared.index] = prepared
+        self._cache.move_to_end(prepared.index)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+
+    def request(self, index):
+        """
+        Start preparing a level in the background if it is not cached or already queued.
+        :param index:
+        :return:
+        """
+        with self._lock:
+            if index in self._cache or index in self._pending:
+                return
+            self._pending[index] = self._executor.submit(build_prepared_level, self.all_levels, index,
+                                                         self.render, self.villain_ai)
+
+
+    def get(self, index):
+        """
+        Return the prepared level, waiting for the worker (or building it here) if needed.
+        :param index:
+        :return:
+        """
+        with self._lock:
+            prepared = self._cache.get(index)
+            if prepared is not None:
+                self._cache.move_to_end(index)
+                self.hits += 1
+                return prepared
+            future = self._pending.pop(index, None)
+        if future is not None:
+            try:
+                prepared = future.result()
+            except Exception as e:
+                logger.conlog("Preload of level %d failed: %s", index, e, level=logger.WARNING)
+        preloaded = prepared is not None
+        if not preloaded:
+            prepared = build_prepared_level(self.all_levels, index, self.render, self.villain_ai)
+        with self._lock:
+            if preloaded:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._store(prepared)
+        return prepared
+
+
+    def shutdown(self):
+        """
+        Stop the worker thread, abandoning any queued work.
+        :return:
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
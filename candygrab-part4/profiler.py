@@ -0,0 +1,228 @@
+# profiler.py
+#
+# Opt-in frame-time instrumentation. Named sections are timed with perf_counter; a rolling
+# window gives p50/p95/max per section for the HUD overlay, and every frame can be written
+# to a CSV for offline analysis. Enable with environment variables:
+#   CANDYGRAB_PROFILE=1                 show the overlay in the HUD bar
+#   CANDYGRAB_PROFILE_CSV=frames.csv    also write one row per frame
+# When disabled the game uses NullProfiler, whose sections are shared no-op objects.
+
+
+import os
+import csv
+import atexit
+from collections import deque
+from time import perf_counter
+import pygame
+from constants import UI_HEIGHT, PADDING
+
+
+STAGES = ("handle_events", "player.update", "update_villains", "handle_firing", "update_beams",
+          "check_death", "scan_world", "tilemap.refresh", "render_frame")
+OVERLAY_REFRESH_FRAMES = 30
+OVERLAY_COLOR = (0, 255, 128)
+
+
+class _Section:
+    """
+    Re-usable context manager that adds its elapsed time to the profiler's current frame.
+    """
+    __slots__ = ("frame_times", "name", "start")
+
+    def __init__(self, frame_times, name):
+        self.frame_times = frame_times
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.frame_times[self.name] = self.frame_times.get(self.name, 0.0) + perf_counter() - self.start
+        return False
+
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class NullProfiler:
+    """
+    Stand-in used when profiling is off; every call is a no-op.
+    """
+    enabled = False
+
+    def section(self, name):
+        return _NULL_SECTION
+
+    def begin_frame(self):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def draw_overlay(self, surface):
+        pass
+
+    def close(self):
+        pass
+
+
+class FrameProfiler:
+    """
+    Times named sections of each frame and keeps a rolling window per section.
+    """
+    enabled = True
+
+    def __init__(self, window=120, csv_path=None, overlay=True, stages=STAGES):
+        self.window = window
+        self.overlay = overlay
+        self.stages = list(stages)
+        self.history = {name: deque(maxlen=window) for name in self.stages + ["frame"]}
+        self.frames = 0
+        self._current = {}
+        self._sections = {}
+        self._frame_start = None
+        self._overlay_surface = None
+        self._font = None
+        self._csv_file = None
+        self._csv = None
+        if csv_path:
+            self._csv_file = open(csv_path, "w", newline="")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(["frame", "frame_ms"] + [f"{name}_ms" for name in self.stages] + ["other_ms"])
+            atexit.register(self.close)
+
+
+    def section(self, name):
+        """
+        Return the timer for a named section, for use as `with profiler.section("scan_world"):`.
+        :param name:
+        :return:
+        """
+        timer = self._sections.get(name)
+        if timer is None:
+            timer = _Section(self._current, name)
+            self._sections[name] = timer
+            if name not in self.history:
+                self.stages.append(name)
+                self.history[name] = deque(maxlen=self.window)
+        return timer
+
+
+    def begin_frame(self):
+        """
+        Start timing a new frame.
+        :return:
+        """
+        self._current.clear()
+        self._frame_start = perf_counter()
+
+
+    def end_frame(self):
+        """
+        Close the current frame: push section times (ms) into the window and the CSV.
+        :return:
+        """
+        if self._frame_start is None:
+            return
+        frame_ms = (perf_counter() - self._frame_start) * 1000.0
+        self.history["frame"].append(frame_ms)
+        row = []
+        for name in self.stages:
+            ms = self._current.get(name, 0.0) * 1000.0
+            self.history[name].append(ms)
+            row.append(ms)
+        if self._csv:
+            other = frame_ms - sum(row)
+            self._csv.writerow([self.frames, f"{frame_ms:.4f}"] + [f"{ms:.4f}" for ms in row] + [f"{other:.4f}"])
+        self.frames += 1
+        self._frame_start = None
+
+
+    def percentiles(self, name):
+        """
+        Return (p50, p95, max) in ms for a section over the rolling window.
+        :param name:
+        :return:
+        """
+        samples = sorted(self.history.get(name, ()))
+        if not samples:
+            return 0.0, 0.0, 0.0
+        last = len(samples) - 1
+        return samples[last // 2], samples[int(last * 0.95)], samples[last]
+
+
+    def summary(self):
+        """
+        Return {section: (p50, p95, max)} for the frame total and every section.
+        :return:
+        """
+        return {name: self.percentiles(name) for name in ["frame"] + self.stages}
+
+
+    def _render_overlay(self, width):
+        """
+        Render the stats table to a cached surface (refreshed every OVERLAY_REFRESH_FRAMES).
+        :param width:
+        :return:
+        """
+        if self._font is None:
+            self._font = pygame.font.SysFont("consolas", 11, bold=True)
+        lines = [f"{name[:15]:<15} {p50:5.2f} {p95:5.2f} {mx:5.2f}" for name, (p50, p95, mx) in self.summary().items()]
+        line_h = self._font.get_linesize()
+        columns = 3
+        per_column = -(-len(lines) // columns)
+        col_w = (width - 2 * PADDING) // columns
+        surf = pygame.Surface((width, min(UI_HEIGHT, per_column * line_h + 4)), pygame.SRCALPHA)
+        surf.fill((0, 0, 0, 170))
+        for i, line in enumerate(lines):
+            col, row = divmod(i, per_column)
+            surf.blit(self._font.render(line, True, OVERLAY_COLOR), (PADDING + col * col_w, 2 + row * line_h))
+        return surf
+
+
+    def draw_overlay(self, surface):
+        """
+        Draw p50/p95/max (ms) per section along the bottom of the HUD bar.
+        :param surface:
+        :return:
+        """
+        if not self.overlay:
+            return
+        if self._overlay_surface is None or self.frames % OVERLAY_REFRESH_FRAMES == 0:
+            self._overlay_surface = self._render_overlay(surface.get_width())
+        surface.blit(self._overlay_surface, (0, UI_HEIGHT - self._overlay_surface.get_height()))
+
+
+    def close(self):
+        """
+        Flush and close the CSV trace, if any.
+        :return:
+        """
+        if self._csv_file:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv = None
+
+
+def profiler_from_env():
+    """
+    Build a FrameProfiler from CANDYGRAB_PROFILE / CANDYGRAB_PROFILE_CSV, or a NullProfiler.
+    :return:
+    """
+    overlay = os.getenv("CANDYGRAB_PROFILE", "").strip().lower() not in ("", "0", "off", "false")
+    csv_path = os.getenv("CANDYGRAB_PROFILE_CSV") or None
+    if not overlay and not csv_path:
+        return NullProfiler()
+    return FrameProfiler(csv_path=csv_path, overlay=overlay)
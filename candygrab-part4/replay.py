@@ -0,0 +1,251 @@
+# replay.py
+#
+# Input recording and playback. A replay file is a small header (level, RNG seed, start
+# time of the simulation clock) followed by one byte per fixed simulation step holding that
+# step's (dx, dy, fire). World.step is deterministic given those, so a replay reproduces a
+# play session exactly: attach it to a bug report, or use real sessions as benchmarks.
+#   CANDYGRAB_RECORD=session.cgr python main.py     record while playing
+#   python replay.py session.cgr                     play back in a window at normal speed
+#   python replay.py session.cgr --speed 4           ... at 4x
+#   python replay.py session.cgr --headless          run as fast as possible, print stats
+
+
+import os
+import json
+import atexit
+import random
+import struct
+import argparse
+import pygame
+import logger
+from constants import STEP_MS, SIM_HZ, MAX_SIM_STEPS, SCREEN_WIDTH, FPS
+from game_init import setup_screen
+from scoredisplay import ScoreDisplay
+from display import render_frame
+from world import World
+from timestep import FixedTimestep, lerp_position
+from headless import run_headless, ManualClock, world_checksum
+
+
+REPLAY_MAGIC = b'CGRP'
+REPLAY_VERSION = 1
+# magic, version, sim rate, level index, seed, simulation clock start (ms)
+REPLAY_HEADER = struct.Struct('<4sHHHId')
+FIRE_BIT = 0x10
+
+
+def encode_input(dx, dy, fire):
+    """
+    Pack one step's input into a byte: bits 0-1 dx + 1, bits 2-3 dy + 1, bit 4 fire.
+    :param dx:
+    :param dy:
+    :param fire:
+    :return:
+    """
+    return (dx + 1) | ((dy + 1) << 2) | (FIRE_BIT if fire else 0)
+
+
+# byte -> (dx, dy, fire), so decoding is one list index per step
+_DECODE = [((b & 3) - 1, ((b >> 2) & 3) - 1, bool(b & FIRE_BIT)) for b in range(32)]
+
+
+class Replay:
+    """
+    A loaded replay: header fields plus the packed per-step input.
+    """
+    def __init__(self, level_index, seed, start_ms, steps, sim_hz=SIM_HZ):
+        self.level_index = level_index
+        self.seed = seed
+        self.start_ms = start_ms
+        self.steps = steps
+        self.sim_hz = sim_hz
+
+
+    def __len__(self):
+        return len(self.steps)
+
+
+    def input(self, step):
+        """
+        Return (dx, dy, fire) for a simulation step.
+        :param step:
+        :return:
+        """
+        return _DECODE[self.steps[step]]
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a replay file.
+        :param path:
+        :return:
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < REPLAY_HEADER.size:
+            raise ValueError(f"{path}: not a replay file")
+        magic, version, sim_hz, level_index, seed, start_ms = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path}: not a version {REPLAY_VERSION} replay file")
+        if sim_hz != SIM_HZ:
+            raise ValueError(f"{path}: recorded at {sim_hz} Hz, this build simulates at {SIM_HZ} Hz")
+        return cls(level_index, seed, start_ms, data[REPLAY_HEADER.size:], sim_hz)
+
+
+class ReplayRecorder:
+    """
+    Streams one byte per simulation step to a replay file.
+    """
+    def __init__(self, path, level_index, seed, start_ms):
+        self.path = path
+        self.steps = 0
+        self._file = open(path, 'wb')
+        self._file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, SIM_HZ, level_index, seed, start_ms))
+        atexit.register(self.close)
+
+
+    def record(self, dx, dy, fire):
+        """
+        Append the input used for one simulation step.
+        :param dx:
+        :param dy:
+        :param fire:
+        :return:
+        """
+        self._file.write(bytes((encode_input(dx, dy, fire),)))
+        self.steps += 1
+
+
+    def close(self):
+        """
+        Flush and close the file.
+        :return:
+        """
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class ReplayInput:
+    """
+    Input source for headless.run_headless that feeds a replay step by step.
+    """
+    def __init__(self, replay):
+        self.replay = replay
+
+    def next(self, frame):
+        """
+        Return (dx, dy, fire) for the given frame number (idle once the replay has ended).
+        :param frame:
+        :return:
+        """
+        if frame < len(self.replay):
+            return self.replay.input(frame)
+        return 0, 0, False
+
+
+def recorder_from_env(level_index, start_ms):
+    """
+    Start recording if CANDYGRAB_RECORD names a file. The global RNG is seeded from
+    CANDYGRAB_SEED (or a fresh random seed), and the seed is stored in the replay.
+    :param level_index: level the session starts on
+    :param start_ms: simulation clock at the first step
+    :return: ReplayRecorder, or None when not recording
+    """
+    path = os.getenv("CANDYGRAB_RECORD")
+    if not path:
+        return None
+    seed = int(os.getenv("CANDYGRAB_SEED") or random.randrange(2 ** 32))
+    random.seed(seed)
+    print(f"Recording replay to {path} (seed {seed})")
+    return ReplayRecorder(path, level_index, seed, start_ms)
+
+
+def play_headless(replay, all_levels):
+    """
+    Run a replay through the simulation as fast as possible.
+    :param replay:
+    :param all_levels:
+    :return: stats dict from run_headless
+    """
+    random.seed(replay.seed)
+    return run_headless(all_levels, replay.level_index, len(replay), replay.seed,
+                        input_source=ReplayInput(replay), clock=ManualClock(replay.start_ms))
+
+
+def play_rendered(replay, all_levels, speed=1.0):
+    """
+    Play a replay back in a window, with the simulation running at speed x real time.
+    Escape or closing the window stops playback.
+    :param replay:
+    :param all_levels:
+    :param speed: speed multiplier (2.0 = twice as fast)
+    :return: the World at the end of playback
+    """
+    screen, clock = setup_screen()
+    random.seed(replay.seed)
+    world = World(all_levels, level_index=replay.level_index)
+    score_display = ScoreDisplay(SCREEN_WIDTH)
+    # fast playback may need more than MAX_SIM_STEPS per rendered frame to keep up
+    timestep = FixedTimestep(max_steps=int(MAX_SIM_STEPS * max(1.0, speed)), start_ms=replay.start_ms)
+    step = 0
+    elapsed_ms = 0
+    while step < len(replay):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                return world
+        for _ in range(timestep.advance(elapsed_ms * speed)):
+            if step >= len(replay):
+                break
+            dx, dy, fire = replay.input(step)
+            step += 1
+            if world.step(dx, dy, fire, timestep.tick()):
+                world.next_level()
+                timestep.reset()
+                break
+        world.tile_map.refresh()
+        world.camera.follow(*lerp_position(world.player, timestep.alpha))
+        render_frame(screen, world.tile_map, world.player, world.villains, score_display, world.hud, world.beams,
+                     alpha=timestep.alpha, now_ms=timestep.render_ms(), camera=world.camera)
+        elapsed_ms = clock.tick(FPS)
+    return world
+
+
+def define_args():
+    """
+    Define command line arguments for replay playback.
+    :return:
+    """
+    parser = argparse.ArgumentParser(description="Play back a recorded Candy Grab session.")
+    parser.add_argument("replay", help="replay file written with CANDYGRAB_RECORD")
+    parser.add_argument("--config", default="config/levels.json", help="levels JSON file")
+    parser.add_argument("--headless", action="store_true", help="simulate without a window as fast as possible")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed multiplier for windowed playback")
+    return parser.parse_args()
+
+
+def main():
+    """
+    Load a replay and play it back.
+    :return:
+    """
+    args = define_args()
+    replay = Replay.load(args.replay)
+    with open(args.config) as f:
+        all_levels = json.load(f)["levels"]
+    seconds = len(replay) * STEP_MS / 1000.0
+    print(f"{args.replay}: level {replay.level_index}, seed {replay.seed}, {len(replay)} steps ({seconds:.1f}s)")
+    if args.headless:
+        logger.configure(level="warning")
+        stats = play_headless(replay, all_levels)
+        print(f"{stats['frames']} steps in {stats['seconds']:.2f}s = {stats['ticks_per_sec']:.0f} ticks/s | "
+              f"score {stats['score']} deaths {stats['deaths']} levels cleared {stats['levels_cleared']} | "
+              f"checksum {stats['checksum']}")
+        return
+    world = play_rendered(replay, all_levels, args.speed)
+    print(f"score {world.hud.score} | checksum {world_checksum(world)}")
+
+
+if __name__ == '__main__':
+    main()
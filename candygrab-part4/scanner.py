@@ -1,9 +1,12 @@
 # scanner.py
 
 
-from typing import Iterable, Tuple, Set, List, Any
-from logger import conlog
+from itertools import islice
+from typing import Iterable, Tuple, Set, List, Any, Dict
+from logger import conlog, log_enabled, DEBUG
 from movement import get_tile_position
+from occupancy import TileOccupancy
+from tilegrid import TileGrid
 from constants import *
 
 def _safe_cell(map_data: List[List[str]], cx: int, cy: int) -> str:
@@ -14,6 +17,8 @@ def _safe_cell(map_data: List[List[str]], cx: int, cy: int) -> str:
     :param cy:
     :return:
     """
+    if isinstance(map_data, TileGrid):
+        return map_data.char_at(cx, cy)
     try:
         if 0 <= cy < len(map_data) and 0 <= cx < len(map_data[0]):
             return map_data[cy][cx]
@@ -31,6 +36,8 @@ def _find_all_candy_tiles(map_data: List[List[str]], candy_chars: Set[str]) -> L
     :param candy_chars:
     :return:
     """
+    if isinstance(map_data, TileGrid):
+        return map_data.positions_of(candy_chars)
     hits = []
     for y, row in enumerate(map_data):
         for x, ch in enumerate(row):
@@ -39,6 +46,66 @@ def _find_all_candy_tiles(map_data: List[List[str]], candy_chars: Set[str]) -> L
     return hits
 
 
+class CandyIndex:
+    """
+    Index of candy tiles for one level: (x, y) -> char plus a running count.
+    Built once at level load; pickups update it in O(1) so nothing has to rescan the map.
+    """
+    def __init__(self, positions: Dict[Tuple[int, int], str] = None):
+        self.positions = dict(positions or {})
+        self.count = len(self.positions)
+
+
+    @classmethod
+    def from_map(cls, map_data: List[List[str]], candy_chars: Set[str] = None) -> "CandyIndex":
+        """
+        Build the index with one full scan of the map.
+        :param map_data:
+        :param candy_chars:
+        :return:
+        """
+        hits = _find_all_candy_tiles(map_data, candy_chars or DEFAULT_CANDY)
+        return cls({(x, y): ch for x, y, ch in hits})
+
+
+    def remove(self, x: int, y: int) -> str:
+        """
+        Remove the candy at (x, y), returning its char (or None if there was none).
+        :param x:
+        :param y:
+        :return:
+        """
+        ch = self.positions.pop((x, y), None)
+        if ch is not None:
+            self.count -= 1
+        return ch
+
+
+    def is_empty(self) -> bool:
+        """
+        Check whether every candy has been collected.
+        :return:
+        """
+        return self.count == 0
+
+
+    def preview(self, limit: int = 6) -> List[Tuple[int, int, str]]:
+        """
+        Return up to `limit` remaining candy tiles as (x, y, char).
+        :param limit:
+        :return:
+        """
+        return [(x, y, ch) for (x, y), ch in islice(self.positions.items(), limit)]
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __contains__(self, xy):
+        return xy in self.positions
+
+
 def _score_for_char(ch: str, tile_lookup: Any) -> int:
     """
     Given a character and a tile_lookup (from tiles.csv), return the score for that tile.
@@ -63,7 +130,8 @@ def _score_for_char(ch: str, tile_lookup: Any) -> int:
 
 
 def scan_world(map_data: List[List[str]], player, villains: Iterable, tile_lookup,
-               hud, candy_chars: Set[str] = None, candy_sound =     None) -> None:
+               hud, candy_chars: Set[str] = None, candy_sound =     None, tile_map=None,
+               candy_index: CandyIndex = None, occupancy: TileOccupancy = None) -> None:
     """
     Scan the game world for player, villains, and candy states.
     :param map_data:
@@ -72,51 +140,56 @@ def scan_world(map_data: List[List[str]], player, villains: Iterable, tile_looku
     :param tile_lookup:
     :param hud:
     :param candy_chars:
+    :param candy_sound:
+    :param tile_map: optional TileMapSurface to notify of changed cells
+    :param candy_index: CandyIndex for this level; built from the map if not supplied
+    :param occupancy: this frame's TileOccupancy of villains; built if not supplied
     :return:
     """
     candy_chars = candy_chars or DEFAULT_CANDY
+    if candy_index is None:
+        candy_index = CandyIndex.from_map(map_data, candy_chars)
     # Player tile and cell
     pcx, pcy = get_tile_position(player)
     pcell = _safe_cell(map_data, pcx, pcy)
     #conlog(f"[Scanner] Player tile=({pcx},{pcy}) cell='{pcell}'")
-    # Villain tiles and cells
-    vtiles = []
-    for v in villains:
-        vcx, vcy = get_tile_position(v)
-        vcell = _safe_cell(map_data, vcx, vcy)
-        vtiles.append((v, vcx, vcy, vcell))
-        #conlog(f"[Scanner] {v.name} tile=({vcx},{vcy}) cell='{vcell}'")
-    # Candy tiles (scan by map chars)
-    candy_list = _find_all_candy_tiles(map_data, candy_chars)
-    if candy_list:
-        preview = ", ".join([f"({x},{y}) '{ch}'" for x, y, ch in candy_list[:6]])
-        more = "" if len(candy_list) <= 6 else f" (+{len(candy_list)-6} more)"
-        #conlog(f"[Scanner] Candy tiles: {preview}{more}")
+    # Candy tiles (read from the index, no map scan)
+    if candy_index.count:
+        if log_enabled("scanner", DEBUG):
+            preview = ", ".join([f"({x},{y}) '{ch}'" for x, y, ch in candy_index.preview(6)])
+            more = "" if candy_index.count <= 6 else f" (+{candy_index.count-6} more)"
+            conlog("[Scanner] Candy tiles: %s%s", preview, more, level=DEBUG, category="scanner")
     else:
-        conlog("[Scanner] Candy tiles: none found")
+        conlog("[Scanner] Candy tiles: none found", level=DEBUG, category="scanner")
         # This may be where to trigger stage progression in future
-    # Checks for impact/attackable
-    for v, vcx, vcy, vcell in vtiles:
-        if vcx == pcx and vcy == pcy:
-            if vcell not in NON_ELIGIBLE and pcell not in NON_ELIGIBLE:
+    # Checks for impact/attackable (tile lookups on the shared occupancy grid)
+    if occupancy is None:
+        occupancy = TileOccupancy(villains)
+    if pcell not in NON_ELIGIBLE:
+        for vcx, v in occupancy.in_row(pcy, pcx - 3, pcx + 3):
+            vcell = _safe_cell(map_data, vcx, pcy)
+            if vcell in NON_ELIGIBLE:
+                continue
+            dx_tiles = abs(vcx - pcx)
+            if dx_tiles == 0:
                 # conlog(f"[Scanner] IMPACT: {v.name} and Player share tile ({pcx},{pcy}) on '{vcell}'")
                 pass
-        dx_tiles = abs(vcx - pcx)
-        if vcy == pcy and dx_tiles <= 3 and dx_tiles != 0:
-            if vcell not in NON_ELIGIBLE and pcell not in NON_ELIGIBLE:
+            else:
                 # conlog(f"[Scanner] ATTACKABLE: {v.name} within {dx_tiles} tiles of Player on row {pcy}")
                 pass
     # Candy collection
     if pcell in candy_chars:
         gained = _score_for_char(pcell, tile_lookup)
         map_data[pcy][pcx] = ' '  # remove candy
+        candy_index.remove(pcx, pcy)
+        if tile_map is not None:
+            tile_map.mark_dirty(pcx, pcy)
         hud.score += gained
-        conlog(f"[Scanner] Player collected '{pcell}' for +{gained}. Score={hud.score}")
+        conlog("[Scanner] Player collected '%s' for +%d. Score=%d", pcell, gained, hud.score, category="scanner")
         # If you have a helper to consume candy, use it
         if candy_sound:
             candy_sound.play()
         # After removal, check if any candy remains
-        remaining = _find_all_candy_tiles(map_data, candy_chars)
-        if not remaining:
+        if candy_index.is_empty():
             # Hook for future stage progression
-            conlog("[Scanner] All candy collected. Stage progression trigger pending.")
+            conlog("[Scanner] All candy collected. Stage progression trigger pending.", category="scanner")
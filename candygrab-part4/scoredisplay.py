@@ -3,6 +3,7 @@
 
 import pygame
 from loader import TILE_SIZE
+from atlas import get_tile
 from constants import UI_HEIGHT, FONT_PATH, SPRITESHEET_PATH, BAR_BG, TEXT_COLOR, PADDING, ICON_SPACING
 
 
@@ -18,9 +19,7 @@ class ScoreDisplay:
         Load the life icon from the spritesheet (first tile).
         :return:
         """
-        sheet = pygame.image.load(SPRITESHEET_PATH).convert_alpha()
-        rect = pygame.Rect(0, 0, TILE_SIZE, TILE_SIZE)
-        return sheet.subsurface(rect)
+        return get_tile(0, 0, SPRITESHEET_PATH)
 
 
     def draw(self, surface, level_number, score, lives):
@@ -1,21 +1,14 @@
 # spritesheet.py
 
 
-import pygame
-from constants import TILE_SIZE
+from atlas import get_tiles
 
 
 def load_spritesheet(path):
     """
     Load a spritesheet and return a list of subsurfaces for each tile.
+    The sheet is decoded once and shared through the atlas cache.
     :param path:
     :return:
     """
-    sheet = pygame.image.load(path).convert_alpha()
-    sheet_width, sheet_height = sheet.get_size()
-    cols, rows = sheet_width // TILE_SIZE, sheet_height // TILE_SIZE
-    return [
-        sheet.subsurface(pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
-        for y in range(rows)
-        for x in range(cols)
-    ]
\ No newline at end of file
+    return get_tiles(path)
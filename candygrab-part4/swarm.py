@@ -0,0 +1,307 @@
+# swarm.py
+#
+# Batched villain update over struct-of-arrays. Villain.update (per object) stays the
+# reference implementation; VillainSwarm reproduces the same rules in vectorised NumPy
+# passes over every villain at once (timers, disable/wake, floor snap, alignment, floor
+# checks, path-following direction and the try_move collision rules). The rare branches
+# (snapping over empty space, greedy steering when there is no path) are handed back to
+# the reference code for just those villains. Villain objects are kept in sync, so
+# drawing, combat and scanning keep working on the usual list.
+
+
+import numpy as np
+from constants import TILE_SIZE, SNAP_TICKS, ANIM_TICKS, STEP_SCALE
+from tilegrid import TileGrid, OUT_OF_BOUNDS
+from movement import get_tile_position
+
+
+SWARM_MIN_VILLAINS = 64   # below this the per-object loop is faster than the NumPy overhead
+
+# Step order used by NavGraph._build when it lists a node's moves
+_NAV_MOVES = ((-1, 0), (1, 0), (0, 1), (0, -1))
+_MOVE_DX = np.array([m[0] for m in _NAV_MOVES] + [0])   # index -1 = no move
+_MOVE_DY = np.array([m[1] for m in _NAV_MOVES] + [0])
+_PREFER_INDEX = np.full(9, -1)                          # (dx + 1) * 3 + (dy + 1) -> move index
+for _k, (_dx, _dy) in enumerate(_NAV_MOVES):
+    _PREFER_INDEX[(_dx + 1) * 3 + (_dy + 1)] = _k
+
+
+def _char_table(chars):
+    """
+    256-entry lookup table that is True for the given tile characters.
+    :param chars:
+    :return:
+    """
+    table = np.zeros(256, dtype=bool)
+    table[[ord(c) for c in chars]] = True
+    return table
+
+
+_IS_LADDER = _char_table('LDEUT')
+_IS_DE = _char_table('DE')
+_IS_LEUF = _char_table('LEUF')
+_F, _B, _T, _L, _SPACE = (ord(c) for c in 'FBTL ')
+
+
+class VillainSwarm:
+    """
+    Struct-of-arrays view of one level's villains with a vectorised update().
+    """
+    def __init__(self, villains, map_data, nav=None):
+        self.villains = list(villains)
+        self.map_data = map_data
+        self.nav = nav if nav is not None else (self.villains[0].nav if self.villains else None)
+        self.speed = np.array([v.MOVE_SPEED for v in self.villains], dtype=np.float64)
+        self.timer = np.array([v.timer for v in self.villains], dtype=np.int64)
+        self.frame = np.array([v.frame for v in self.villains], dtype=np.int64)
+        self.n_frames = np.array([len(v.sprites) for v in self.villains], dtype=np.int64)
+        self.last_dx = np.array([v.last_dx for v in self.villains], dtype=np.int64)
+        self.last_dy = np.array([v.last_dy for v in self.villains], dtype=np.int64)
+        self.facing_left = np.array([v.facing_left for v in self.villains], dtype=bool)
+        self.x = np.zeros(len(self.villains))
+        self.y = np.zeros(len(self.villains))
+        self.disabled_until = np.zeros(len(self.villains), dtype=np.int64)
+        self.fallbacks = 0   # villains handed to the reference code by the last update()
+        # Padded byte grid sharing memory with the TileGrid, so candy pickups show up live
+        self.grid = np.frombuffer(map_data.cells, dtype=np.uint8).reshape(map_data.height + 2, map_data.stride)
+        self.flat = self.grid.reshape(-1)
+        self.height, self.width, self.stride = map_data.height, map_data.width, map_data.stride
+        self.max_x = (self.width - 1) * TILE_SIZE   # right-edge check from movement.try_move
+        self._offsets = np.array([dy * self.stride + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+        self._edge_masks = self._build_edge_masks()
+        self._field_target = None
+        self._tables = None
+
+
+    @staticmethod
+    def supports(map_data):
+        """
+        The swarm reads the map through TileGrid's byte buffer.
+        :param map_data:
+        :return:
+        """
+        return isinstance(map_data, TileGrid)
+
+
+    def _build_edge_masks(self):
+        """
+        One (height, width) bool array per NavGraph move saying whether that move leaves each tile.
+        :return:
+        """
+        masks = np.zeros((len(_NAV_MOVES), self.height, self.width), dtype=bool)
+        if self.nav is None:
+            return masks
+        for (x, y), moves in self.nav.edges.items():
+            for move in moves:
+                masks[_NAV_MOVES.index(move), y, x] = True
+        return masks
+
+
+    def _path_tables(self, target):
+        """
+        Per-target lookup tables built from the NavGraph distance field (cached until the target
+        tile changes): dist (height, width; -1 = no path), on_path (move k from a tile lies on a
+        shortest path) and first (index of the first such move in NavGraph order, -1 = none).
+        :param target:
+        :return:
+        """
+        field = self.nav.distance_field(target)
+        if target != self._field_target or self._tables is None:
+            dist = np.full((self.height + 2, self.width + 2), -1, dtype=np.int64)
+            if field:
+                xs, ys = zip(*field)
+                dist[np.array(ys) + 1, np.array(xs) + 1] = list(field.values())
+            inner = dist[1:-1, 1:-1]
+            on_path = np.zeros((len(_NAV_MOVES), self.height, self.width), dtype=bool)
+            for k, (mdx, mdy) in enumerate(_NAV_MOVES):
+                neighbour = dist[1 + mdy:self.height + 1 + mdy, 1 + mdx:self.width + 1 + mdx]
+                on_path[k] = self._edge_masks[k] & (inner > 0) & (neighbour == inner - 1)
+            first = np.where(on_path.any(axis=0), on_path.argmax(axis=0), -1)
+            self._field_target = target
+            self._tables = (inner, on_path, first)
+        return self._tables
+
+
+    def _gather(self):
+        """
+        Read back state other code may have changed on the objects (hits, teleports).
+        :return:
+        """
+        state = np.array([(v.x, v.y, v.disabled_until) for v in self.villains], dtype=np.float64)
+        self.x[:], self.y[:] = state[:, 0], state[:, 1]
+        self.disabled_until[:] = state[:, 2]
+
+
+    def _scatter(self, idx=None):
+        """
+        Write array state back onto the Villain objects.
+        :param idx: indices to write (all if None)
+        :return:
+        """
+        idx = range(len(self.villains)) if idx is None else idx
+        x, y, ldx, ldy = self.x.tolist(), self.y.tolist(), self.last_dx.tolist(), self.last_dy.tolist()
+        timer, frame, facing = self.timer.tolist(), self.frame.tolist(), self.facing_left.tolist()
+        for i in idx:
+            v = self.villains[i]
+            v.x, v.y, v.last_dx, v.last_dy = x[i], y[i], ldx[i], ldy[i]
+            v.timer, v.frame, v.facing_left = timer[i], frame[i], facing[i]
+
+
+    def _regather(self, idx):
+        """
+        Pull the movement state of the given villains back after the reference code ran on them.
+        :param idx:
+        :return:
+        """
+        for i in idx:
+            v = self.villains[i]
+            self.x[i], self.y[i] = v.x, v.y
+            self.last_dx[i], self.last_dy[i], self.facing_left[i] = v.last_dx, v.last_dy, v.facing_left
+
+
+    def _neighbourhood(self, idx):
+        """
+        Tile positions and the 3x3 neighbourhood bytes for the villains in idx.
+        :param idx:
+        :return: (cx, cy, nb) where nb[:, k] is the k-th neighbour in NEIGHBOUR_KEYS order
+        """
+        cx = np.rint(self.x[idx] / TILE_SIZE).astype(np.int64)
+        cy = np.rint(self.y[idx] / TILE_SIZE).astype(np.int64)
+        # within one tile of the map the border column/row already reads as '~'
+        base = (np.minimum(np.maximum(cy, -1), self.height) + 1) * self.stride + \
+            np.minimum(np.maximum(cx, -1), self.width) + 1
+        nb = self.flat[base[:, None] + self._offsets]
+        far = (cx < -1) | (cx > self.width) | (cy < -1) | (cy > self.height)
+        if far.any():
+            nb[far] = ord(OUT_OF_BOUNDS)
+        return cx, cy, nb
+
+
+    def _try_move(self, idx, dx, dy, nb):
+        """
+        Vectorised movement.try_move for villains (same checks, same order of effect).
+        :param idx: villain indices
+        :param dx: per-villain x direction
+        :param dy: per-villain y direction
+        :param nb: (n, 9) neighbourhood of those villains, from _neighbourhood
+        :return:
+        """
+        if len(idx) == 0:
+            return
+        left, center, right, locen = nb[:, 3], nb[:, 4], nb[:, 5], nb[:, 7]
+        x0, y0, speed = self.x[idx], self.y[idx], self.speed[idx]
+        nudge = center == _F
+        new_x = x0 + dx * speed
+        new_y = y0 + dy * speed
+        tx = np.rint(new_x / TILE_SIZE).astype(np.int64)
+        ty = np.floor(new_y / TILE_SIZE).astype(np.int64)
+        rem = x0 % TILE_SIZE
+        ok = ~nudge & ((dx != 0) | (dy != 0)) & (new_x >= 0) & (new_x <= self.max_x)
+        ok &= ~((dy != 0) & (np.minimum(rem, TILE_SIZE - rem) > 4))
+        ok &= (ty >= 0) & (ty < self.height) & (tx >= 0) & (tx < self.width)
+        aligned = (rem <= 3) | (rem >= TILE_SIZE - 3)
+        lateral = (center == _L) | (center == _T) | (ty + 1 >= self.height) | \
+            (aligned & (((dx == -1) & (left == _B)) | ((dx == 1) & (right == _B))))
+        ok &= ~((dx != 0) & lateral)
+        # try_move passes dx to blocks_downward; mirrored here so both paths agree
+        ok &= ~((dx > 0) & ~_IS_DE[center] & ~_IS_LEUF[locen])
+        up_cell = self.grid[np.minimum(np.maximum(ty, -1), self.height) + 1,
+                            np.minimum(np.maximum(tx, -1), self.width) + 1]
+        ok &= ~((dy < 0) & ~_IS_LADDER[up_cell])
+        moved = idx[ok]
+        self.x[moved] = new_x[ok]
+        self.y[moved] = new_y[ok]
+        self.y[idx[nudge]] -= STEP_SCALE
+
+
+    def _nav_steps(self, cx, cy, ldx, ldy, target):
+        """
+        Vectorised NavGraph.next_step for villains standing on (cx, cy), preferring the
+        villain's last move when it is also on a shortest path.
+        :return: (at_target, has_step, step_dx, step_dy)
+        """
+        dist, on_path, first = self._path_tables(target)
+        inside = (cx >= 0) & (cx < self.width) & (cy >= 0) & (cy < self.height)
+        sx = np.minimum(np.maximum(cx, 0), self.width - 1)
+        sy = np.minimum(np.maximum(cy, 0), self.height - 1)
+        prefer = _PREFER_INDEX[(ldx + 1) * 3 + (ldy + 1)]
+        use_prefer = (prefer >= 0) & on_path[np.maximum(prefer, 0), sy, sx]
+        choice = np.where(inside, np.where(use_prefer, prefer, first[sy, sx]), -1)
+        at_target = inside & (dist[sy, sx] == 0)
+        return at_target, choice >= 0, _MOVE_DX[choice], _MOVE_DY[choice]
+
+
+    def update(self, player, map_data, now_ms):
+        """
+        Advance every villain by one step; equivalent to calling Villain.update on each.
+        :param player:
+        :param map_data:
+        :param now_ms: game clock in ms
+        :return:
+        """
+        vs = self.villains
+        if not vs:
+            return
+        self._gather()
+        self.timer += 1
+        # Disable / wake handling stays on the objects (sounds), but only for hit villains
+        for i in np.flatnonzero(self.disabled_until).tolist():
+            vs[i].update_disabled(now_ms)
+            self.disabled_until[i] = vs[i].disabled_until
+        active = (self.disabled_until == 0) | (now_ms >= self.disabled_until)
+        idx = np.flatnonzero(active)
+        # maybe_snap_to_floor
+        snap = idx[self.timer[idx] % SNAP_TICKS == 0]
+        if len(snap):
+            cx, cy, nb = self._neighbourhood(snap)
+            hit = (nb[:, 4] == _SPACE) & (nb[:, 7] == _F) & \
+                ((np.floor(self.x[snap]) != cx * TILE_SIZE) | (np.floor(self.y[snap]) != cy * TILE_SIZE))
+            self.y[snap[hit]] = (cy * TILE_SIZE)[hit]
+        # animation
+        anim = idx[self.timer[idx] % ANIM_TICKS == 0]
+        self.frame[anim] = (self.frame[anim] + 1) % self.n_frames[anim]
+        # handle_floor_collision
+        cx, cy, nb = self._neighbourhood(idx)
+        in_floor = nb[:, 4] == _F
+        self.y[idx[in_floor]] -= STEP_SCALE
+        keep = ~in_floor
+        idx, cx, cy, nb = idx[keep], cx[keep], cy[keep], nb[keep]
+        left, right, locen = nb[:, 3], nb[:, 5], nb[:, 7]
+        # finish a horizontal move until aligned
+        unaligned_x = (np.floor(self.x[idx] % TILE_SIZE) > 1) & (right != _B) & (left != _B) & (locen != _SPACE)
+        # over empty space: choose_snap (reference code)
+        over_gap = ~unaligned_x & (locen == _SPACE)
+        # finish a vertical move until aligned
+        unaligned_y = ~unaligned_x & ~over_gap & (np.floor(self.y[idx] % TILE_SIZE) > 1)
+        rest = ~(unaligned_x | over_gap | unaligned_y)
+        fallback = list(idx[over_gap])
+        if self.nav is not None:
+            sel = np.flatnonzero(rest)
+            target = get_tile_position(player)
+            at_target, has_step, sdx, sdy = self._nav_steps(cx[sel], cy[sel], self.last_dx[idx[sel]],
+                                                            self.last_dy[idx[sel]], target)
+            # on the player's tile the reference greedy step just clears the direction
+            self.last_dx[idx[sel[at_target]]] = 0
+            self.last_dy[idx[sel[at_target]]] = 0
+            fallback += list(idx[sel[~has_step & ~at_target]])
+            follow = sel[has_step]
+            fi = idx[follow]
+            sdx, sdy = sdx[has_step], sdy[has_step]
+            self.last_dx[fi], self.last_dy[fi] = sdx, sdy
+            self.facing_left[fi] = np.where(sdx != 0, sdx > 0, self.facing_left[fi])
+        else:
+            fallback += list(idx[rest])
+            follow, sdx, sdy = np.array([], dtype=np.int64), 0, 0
+        # one try_move pass for every villain that moves this step
+        dx = np.where(unaligned_x, self.last_dx[idx], 0)
+        dy = np.where(unaligned_y, self.last_dy[idx], 0)
+        dx[follow], dy[follow] = sdx, sdy
+        sel = np.flatnonzero((dx != 0) | (dy != 0))
+        self._try_move(idx[sel], dx[sel], dy[sel], nb[sel])
+        self.fallbacks = len(fallback)
+        if fallback:
+            self._scatter(fallback)
+            for i in fallback:
+                vs[i]._decide_movement(player, *get_tile_position(vs[i]), map_data)
+            self._regather(fallback)
+        self._scatter()
@@ -0,0 +1,267 @@
+# tilegrid.py
+
+
+from typing import Iterable, List, Tuple
+from constants import DEFAULT_CANDY
+
+
+OUT_OF_BOUNDS = '~'
+
+# Tile-class bits
+SOLID = 1
+LADDER = 2
+FLOOR = 4
+CANDY = 8
+
+TILE_CLASSES = {
+    'F': SOLID | FLOOR,
+    'B': SOLID,
+    'T': LADDER | FLOOR,
+    'L': LADDER,
+    'U': LADDER,
+    'D': LADDER,
+    'E': LADDER,
+}
+for _ch in DEFAULT_CANDY:
+    TILE_CLASSES[_ch] = CANDY
+
+_CLASS_TABLE = bytes(TILE_CLASSES.get(chr(i), 0) for i in range(256))
+_OOB = ord(OUT_OF_BOUNDS)
+
+
+class _RowView:
+    """
+    List-like view of one map row so existing map_data[y][x] call sites keep working.
+    """
+    __slots__ = ("_grid", "_y")
+
+    def __init__(self, grid, y):
+        self._grid = grid
+        self._y = y
+
+    def _index(self, x):
+        width = self._grid.width
+        if x < 0:
+            x += width
+        if not 0 <= x < width:
+            raise IndexError("map column out of range")
+        return self._grid._offset(x, self._y)
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return list(self)[x]
+        return chr(self._grid.cells[self._index(x)])
+
+    def __setitem__(self, x, ch):
+        self._grid.cells[self._index(x)] = ord(ch)
+
+    def __len__(self):
+        return self._grid.width
+
+    def __iter__(self):
+        start = self._grid._offset(0, self._y)
+        return iter(self._grid.cells[start:start + self._grid.width].decode('latin-1'))
+
+    def __contains__(self, ch):
+        start = self._grid._offset(0, self._y)
+        return self._grid.cells.find(ord(ch), start, start + self._grid.width) != -1
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class TileGrid:
+    """
+    Compact level map: one byte per tile in a bytearray, with a one-tile '~' border so
+    neighbourhood reads never need bounds checks. grid[y][x] still works through row views.
+    """
+    def __init__(self, rows: Iterable[Iterable[str]]):
+        rows = [list(r) for r in rows]
+        self.height = len(rows)
+        self.width = max((len(r) for r in rows), default=0)
+        self.stride = self.width + 2
+        self.cells = bytearray([_OOB]) * (self.stride * (self.height + 2))
+        for y, row in enumerate(rows):
+            start = self._offset(0, y)
+            self.cells[start:start + len(row)] = ''.join(row).encode('latin-1')
+            self.cells[start + len(row):start + self.width] = b' ' * (self.width - len(row))
+        self._rows = [_RowView(self, y) for y in range(self.height)]
+
+
+    @classmethod
+    def from_bytes(cls, width, height, data) -> "TileGrid":
+        """
+        Build a grid directly from width * height row-major tile bytes (e.g. a compiled level),
+        skipping the per-character row handling of the constructor.
+        :param width:
+        :param height:
+        :param data: bytes-like of length width * height
+        :return:
+        """
+        grid = cls.__new__(cls)
+        grid.width, grid.height, grid.stride = width, height, width + 2
+        grid.cells = bytearray([_OOB]) * (grid.stride * (height + 2))
+        data = bytes(data)
+        for y in range(height):
+            start = grid._offset(0, y)
+            grid.cells[start:start + width] = data[y * width:(y + 1) * width]
+        grid._rows = [_RowView(grid, y) for y in range(height)]
+        return grid
+
+
+    def to_bytes(self) -> bytes:
+        """
+        Return the tiles as width * height row-major bytes, without the border.
+        :return:
+        """
+        return b''.join(bytes(self.cells[self._offset(0, y):self._offset(0, y) + self.width])
+                        for y in range(self.height))
+
+
+    def _offset(self, x, y):
+        return (y + 1) * self.stride + x + 1
+
+
+    def __len__(self):
+        return self.height
+
+
+    def __getitem__(self, y):
+        return self._rows[y]
+
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+    def in_bounds(self, x, y) -> bool:
+        """
+        Check whether (x, y) is inside the map.
+        :param x:
+        :param y:
+        :return:
+        """
+        return 0 <= x < self.width and 0 <= y < self.height
+
+
+    def char_at(self, x, y) -> str:
+        """
+        Return the tile character at (x, y), or '~' when out of bounds.
+        :param x:
+        :param y:
+        :return:
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return chr(self.cells[(y + 1) * self.stride + x + 1])
+        return OUT_OF_BOUNDS
+
+
+    def set_char(self, x, y, ch):
+        """
+        Overwrite the tile at (x, y).
+        :param x:
+        :param y:
+        :param ch:
+        :return:
+        """
+        self.cells[self._offset(x, y)] = ord(ch)
+
+
+    def classes_at(self, x, y) -> int:
+        """
+        Return the tile-class bitmask (SOLID | LADDER | FLOOR | CANDY) at (x, y).
+        :param x:
+        :param y:
+        :return:
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return _CLASS_TABLE[self.cells[(y + 1) * self.stride + x + 1]]
+        return 0
+
+
+    def has(self, x, y, mask) -> bool:
+        """
+        Check whether the tile at (x, y) belongs to any class in mask.
+        :param x:
+        :param y:
+        :param mask:
+        :return:
+        """
+        return bool(self.classes_at(x, y) & mask)
+
+
+    def neighbourhood(self, cx, cy) -> str:
+        """
+        Return the 3x3 block around (cx, cy) as a 9-character string in the order
+        upleft, upcen, upright, left, center, right, loleft, locen, loright.
+        No dict is built; callers unpack the string directly.
+        :param cx:
+        :param cy:
+        :return:
+        """
+        if 0 <= cx < self.width and 0 <= cy < self.height:
+            i = (cy + 1) * self.stride + cx + 1
+            s = self.stride
+            cells = self.cells
+            return (cells[i - s - 1:i - s + 2] + cells[i - 1:i + 2] + cells[i + s - 1:i + s + 2]).decode('latin-1')
+        return ''.join(self.char_at(cx + dx, cy + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1))
+
+
+    def positions_of(self, chars) -> List[Tuple[int, int, str]]:
+        """
+        Return (x, y, char) for every tile whose character is in chars, in row-major order.
+        :param chars:
+        :return:
+        """
+        hits = []
+        cells = self.cells
+        for ch in chars:
+            code = ord(ch)
+            i = cells.find(code)
+            while i != -1:
+                y, x = divmod(i, self.stride)
+                hits.append((x - 1, y - 1, ch))
+                i = cells.find(code, i + 1)
+        hits.sort(key=lambda h: (h[1], h[0]))
+        return hits
+
+
+    def to_rows(self) -> List[List[str]]:
+        """
+        Return the map as a plain list of lists of characters.
+        :return:
+        """
+        return [list(row) for row in self._rows]
+
+
+    def copy(self) -> "TileGrid":
+        """
+        Return an independent copy of the grid.
+        :return:
+        """
+        clone = TileGrid.__new__(TileGrid)
+        clone.height, clone.width, clone.stride = self.height, self.width, self.stride
+        clone.cells = bytearray(self.cells)
+        clone._rows = [_RowView(clone, y) for y in range(clone.height)]
+        return clone
+
+
+def neighbourhood(map_data, cx, cy) -> str:
+    """
+    3x3 neighbourhood of (cx, cy) for either a TileGrid or a plain list-of-lists map.
+    :param map_data:
+    :param cx:
+    :param cy:
+    :return:
+    """
+    if isinstance(map_data, TileGrid):
+        return map_data.neighbourhood(cx, cy)
+    height = len(map_data)
+    width = len(map_data[0]) if height else 0
+    return ''.join(
+        map_data[y][x] if 0 <= x < width and 0 <= y < height else OUT_OF_BOUNDS
+        for y in (cy - 1, cy, cy + 1) for x in (cx - 1, cx, cx + 1)
+    )
@@ -2,36 +2,65 @@
 
 
 import pygame
-from constants import TILE_SIZE
+from collections import OrderedDict
+from constants import TILE_SIZE, CHUNK_TILES, MAX_CACHED_CHUNKS, FULL_SURFACE_MAX_TILES
 from spritesheet import load_spritesheet
+from atlas import sheet_size
 from movement import get_tile_position
 from scanner import _safe_cell
 from constants import SPRITESHEET_PATH, SHOW_TILE_COORDS
 
 
-def build_tilemap(map_data, tile_lookup):
+class TileMapSurface:
     """
-    Build a tilemap surface from map data and a tile lookup dictionary.
-    :param map_data:
-    :param tile_lookup:
-    :return:
+    Persistent tilemap surface for one level. The full map is drawn once; after that only
+    cells marked dirty (e.g. candy removed by scan_world) are redrawn.
     """
-    tiles = load_spritesheet(SPRITESHEET_PATH)
-    surface = pygame.Surface(
-        (len(map_data[0]) * TILE_SIZE, len(map_data) * TILE_SIZE + 96),
-        pygame.SRCALPHA
-    )
-    font = pygame.font.SysFont("consolas", 10, bold=True) if SHOW_TILE_COORDS else None
-    cols_in_sheet = sheet_width() // TILE_SIZE
+    def __init__(self, map_data, tile_lookup, surface=None):
+        """
+        :param map_data:
+        :param tile_lookup:
+        :param surface: already drawn surface for this map (e.g. from the level preloader);
+                        a copy is used so the original stays pristine
+        """
+        self._setup(map_data, tile_lookup)
+        if surface is not None:
+            self.surface = surface.copy()
+            return
+        self.surface = pygame.Surface(
+            (len(map_data[0]) * TILE_SIZE, len(map_data) * TILE_SIZE + 96),
+            pygame.SRCALPHA
+        )
+        for y, row in enumerate(map_data):
+            for x in range(len(row)):
+                self._draw_cell(x, y)
+        self.total_cells_redrawn = len(map_data) * len(map_data[0])
+
+
+    def _setup(self, map_data, tile_lookup):
+        """
+        State shared by the full-surface and chunked tilemaps.
+        :param map_data:
+        :param tile_lookup:
+        :return:
+        """
+        self.map_data = map_data
+        self.tile_lookup = tile_lookup
+        self.tiles = load_spritesheet(SPRITESHEET_PATH)
+        self.cols_in_sheet = sheet_width() // TILE_SIZE
+        self.font = pygame.font.SysFont("consolas", 10, bold=True) if SHOW_TILE_COORDS else None
+        self._dirty = set()
+        self.cells_redrawn = 0        # cells redrawn by the last refresh()
+        self.total_cells_redrawn = 0  # cells redrawn since the level was built
 
 
-    def _coords_for(ch):
+    def _coords_for(self, ch):
         """
         Get the (sx, sy) coordinates in the spritesheet for the given character.
         :param ch:
         :return:
         """
-        entry = tile_lookup.get(ch)
+        entry = self.tile_lookup.get(ch)
         if entry is None:
             return None
         coords = entry.get('coords') if isinstance(entry, dict) else entry
@@ -39,21 +68,193 @@ def build_tilemap(map_data, tile_lookup):
             return None
         return int(coords[0]), int(coords[1])
 
-    for y, row in enumerate(map_data):
-        for x, ch in enumerate(row):
-            if ch in ('P', 'V'):
-                continue
-            pos = _coords_for(ch)
-            if pos is None:
-                continue
-            sx, sy = pos
-            tile_index = sy * cols_in_sheet + sx
-            tile = tile_lookup[ch].get('surface') or tiles[tile_index]
-            surface.blit(tile, (x * TILE_SIZE, y * TILE_SIZE))
-            if SHOW_TILE_COORDS and font:
-                label = font.render(f"{x},{y}", True, (255, 255, 0))
-                surface.blit(label, (x * TILE_SIZE + 2, y * TILE_SIZE + 2))
-    return surface
+
+    def _draw_cell(self, x, y):
+        """
+        Clear and redraw a single map cell from the current map data.
+        :param x:
+        :param y:
+        :return:
+        """
+        self._paint_cell(self.surface, x, y, x * TILE_SIZE, y * TILE_SIZE)
+
+
+    def _paint_cell(self, surface, x, y, px, py):
+        """
+        Clear and draw map cell (x, y) onto surface at pixel (px, py).
+        :param surface:
+        :param x:
+        :param y:
+        :param px:
+        :param py:
+        :return:
+        """
+        surface.fill((0, 0, 0, 0), pygame.Rect(px, py, TILE_SIZE, TILE_SIZE))
+        ch = self.map_data[y][x]
+        if ch in ('P', 'V'):
+            return
+        pos = self._coords_for(ch)
+        if pos is None:
+            return
+        sx, sy = pos
+        entry = self.tile_lookup[ch]
+        tile = (entry.get('surface') if isinstance(entry, dict) else None) or \
+            self.tiles[sy * self.cols_in_sheet + sx]
+        surface.blit(tile, (px, py))
+        if SHOW_TILE_COORDS and self.font:
+            label = self.font.render(f"{x},{y}", True, (255, 255, 0))
+            surface.blit(label, (px + 2, py + 2))
+
+
+    def mark_dirty(self, x, y):
+        """
+        Flag a map cell as changed so it is redrawn on the next refresh().
+        :param x:
+        :param y:
+        :return:
+        """
+        self._dirty.add((x, y))
+
+
+    def refresh(self):
+        """
+        Redraw all dirty cells. Cost is O(changed cells) rather than O(map).
+        :return: the tilemap surface
+        """
+        self.cells_redrawn = len(self._dirty)
+        for x, y in self._dirty:
+            self._draw_cell(x, y)
+        self._dirty.clear()
+        self.total_cells_redrawn += self.cells_redrawn
+        return self.surface
+
+
+    def draw(self, screen, camera=None, offset_y=0):
+        """
+        Blit the part of the map the camera sees (the whole map without a camera).
+        :param screen:
+        :param camera:
+        :param offset_y: screen y of the top of the play area
+        :return:
+        """
+        if camera is None:
+            screen.blit(self.surface, (0, offset_y))
+            return
+        area = pygame.Rect(camera.x, camera.y, camera.view_width, camera.view_height)
+        screen.blit(self.surface, (0, offset_y), area)
+
+
+class ChunkedTileMap(TileMapSurface):
+    """
+    Tilemap for large levels: the map is drawn in CHUNK_TILES x CHUNK_TILES chunks, built the
+    first time they come into view and kept in an LRU of MAX_CACHED_CHUNKS, so drawing cost
+    and memory track the viewport rather than the map size.
+    """
+    def __init__(self, map_data, tile_lookup, chunk_tiles=CHUNK_TILES, max_chunks=MAX_CACHED_CHUNKS):
+        self._setup(map_data, tile_lookup)
+        self.surface = None
+        self.chunk_tiles = chunk_tiles
+        self.chunk_px = chunk_tiles * TILE_SIZE
+        self.max_chunks = max_chunks
+        self.width = len(map_data[0])
+        self.height = len(map_data)
+        self._chunks = OrderedDict()   # (chunk x, chunk y) -> Surface, most recently used last
+        self.chunks_built = 0
+
+
+    def _chunk(self, cx, cy):
+        """
+        Return the surface for chunk (cx, cy), drawing it if it is not cached.
+        :param cx:
+        :param cy:
+        :return:
+        """
+        key = (cx, cy)
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            return chunk
+        x0, y0 = cx * self.chunk_tiles, cy * self.chunk_tiles
+        x1, y1 = min(x0 + self.chunk_tiles, self.width), min(y0 + self.chunk_tiles, self.height)
+        chunk = pygame.Surface(((x1 - x0) * TILE_SIZE, (y1 - y0) * TILE_SIZE), pygame.SRCALPHA)
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                self._paint_cell(chunk, x, y, (x - x0) * TILE_SIZE, (y - y0) * TILE_SIZE)
+        self._chunks[key] = chunk
+        self.chunks_built += 1
+        self.total_cells_redrawn += (x1 - x0) * (y1 - y0)
+        while len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+        return chunk
+
+
+    def _draw_cell(self, x, y):
+        """
+        Redraw one cell in its chunk; chunks that are not cached are drawn fresh when next seen.
+        :param x:
+        :param y:
+        :return:
+        """
+        chunk = self._chunks.get((x // self.chunk_tiles, y // self.chunk_tiles))
+        if chunk is not None:
+            self._paint_cell(chunk, x, y, (x % self.chunk_tiles) * TILE_SIZE, (y % self.chunk_tiles) * TILE_SIZE)
+
+
+    def draw(self, screen, camera=None, offset_y=0):
+        """
+        Blit the chunks that overlap the camera view.
+        :param screen:
+        :param camera:
+        :param offset_y: screen y of the top of the play area
+        :return:
+        """
+        if camera is None:
+            x0, y0, x1, y1, cam_x, cam_y = 0, 0, self.width, self.height, 0, 0
+        else:
+            (x0, y0, x1, y1), cam_x, cam_y = camera.visible_tiles(), camera.x, camera.y
+        n = self.chunk_tiles
+        clip = screen.get_clip()
+        if camera is not None:
+            # chunks overhang the view; keep them out of the HUD bar
+            screen.set_clip(clip.clip(pygame.Rect(0, offset_y, camera.view_width, camera.view_height)))
+        for cy in range(y0 // n, min(y1, self.height) // n + 1):
+            for cx in range(x0 // n, min(x1, self.width) // n + 1):
+                if cx * n >= self.width or cy * n >= self.height:
+                    continue
+                screen.blit(self._chunk(cx, cy), (cx * self.chunk_px - cam_x, cy * self.chunk_px - cam_y + offset_y))
+        screen.set_clip(clip)
+
+
+def is_large_map(map_data):
+    """
+    Check whether a map is big enough to need a ChunkedTileMap.
+    :param map_data:
+    :return:
+    """
+    return len(map_data) * len(map_data[0]) > FULL_SURFACE_MAX_TILES
+
+
+def make_tile_map(map_data, tile_lookup, surface=None):
+    """
+    Build the right tilemap for a level: one pre-drawn surface, or chunks for large maps.
+    :param map_data:
+    :param tile_lookup:
+    :param surface: pre-drawn surface to copy (small maps only)
+    :return:
+    """
+    if is_large_map(map_data):
+        return ChunkedTileMap(map_data, tile_lookup)
+    return TileMapSurface(map_data, tile_lookup, surface=surface)
+
+
+def build_tilemap(map_data, tile_lookup):
+    """
+    Build a tilemap surface from map data and a tile lookup dictionary.
+    :param map_data:
+    :param tile_lookup:
+    :return:
+    """
+    return TileMapSurface(map_data, tile_lookup).surface
 
 
 def sheet_width():
@@ -61,8 +262,7 @@ def sheet_width():
     Get the width of the spritesheet.
     :return:
     """
-    image = pygame.image.load(SPRITESHEET_PATH)
-    return image.get_width()
+    return sheet_size(SPRITESHEET_PATH)[0]
 
 
 def find_all_villain_spawns(map_data, char):
@@ -0,0 +1,94 @@
+# timestep.py
+#
+# Fixed-rate simulation clock. Rendered frames feed their real elapsed time into an
+# accumulator; the game then runs as many SIM_HZ steps as that time covers and draws
+# entities interpolated between their previous and current step positions.
+
+
+from constants import STEP_MS, MAX_SIM_STEPS
+
+
+class FixedTimestep:
+    """
+    Accumulator that converts variable frame times into a whole number of fixed steps.
+    """
+    def __init__(self, step_ms=STEP_MS, max_steps=MAX_SIM_STEPS, start_ms=0.0):
+        self.step_ms = step_ms
+        self.max_steps = max_steps
+        self.now_ms = start_ms      # simulation clock, advanced by step_ms per step
+        self.accumulator = 0.0
+        self.dropped_ms = 0.0       # time discarded because a frame needed more than max_steps
+
+
+    def advance(self, elapsed_ms):
+        """
+        Add a frame's elapsed real time and return how many steps to simulate now.
+        :param elapsed_ms:
+        :return:
+        """
+        self.accumulator += elapsed_ms
+        steps = int(self.accumulator // self.step_ms)
+        if steps > self.max_steps:
+            self.dropped_ms += (steps - self.max_steps) * self.step_ms
+            self.accumulator -= (steps - self.max_steps) * self.step_ms
+            steps = self.max_steps
+        self.accumulator -= steps * self.step_ms
+        return steps
+
+
+    def tick(self):
+        """
+        Move the simulation clock forward one step and return it in whole ms.
+        :return:
+        """
+        self.now_ms += self.step_ms
+        return int(self.now_ms)
+
+
+    @property
+    def alpha(self):
+        """
+        Fraction of a step left in the accumulator, for render interpolation (0.0-1.0).
+        :return:
+        """
+        return self.accumulator / self.step_ms
+
+
+    def render_ms(self):
+        """
+        Simulation time at the point being rendered (between the last step and the next).
+        :return:
+        """
+        return int(self.now_ms + self.accumulator)
+
+
+    def reset(self):
+        """
+        Drop any accumulated time, e.g. after a blocking screen such as level complete.
+        :return:
+        """
+        self.accumulator = 0.0
+
+
+def remember_position(entity):
+    """
+    Store the entity's position before a step so it can be interpolated when drawn.
+    :param entity:
+    :return:
+    """
+    entity.prev_x = entity.x
+    entity.prev_y = entity.y
+
+
+def lerp_position(entity, alpha):
+    """
+    Return the entity's draw position interpolated between its previous and current step.
+    :param entity:
+    :param alpha: 0.0 = previous step, 1.0 = current step
+    :return:
+    """
+    if alpha >= 1.0:
+        return entity.x, entity.y
+    px = getattr(entity, "prev_x", entity.x)
+    py = getattr(entity, "prev_y", entity.y)
+    return px + (entity.x - px) * alpha, py + (entity.y - py) * alpha
@@ -2,24 +2,29 @@
 
 import pygame
 from loader import TILE_SIZE
-from logger import conlog
-from visualeffects import hue_shift_sprite
-from constants import DISABLE_WINDOW_MS, DISABLE_DURATION_MS
+from logger import conlog, log_enabled, DEBUG
+from atlas import get_tile, get_hue_shifted, get_flipped
+from constants import DISABLE_WINDOW_MS, DISABLE_DURATION_MS, STEP_SCALE, ANIM_TICKS, STUCK_TICKS, DEFAULT_VILLAIN_AI
+from timestep import lerp_position
+from audio import audio
 from movement import (
-    get_tile_position, get_surrounding_tiles,
+    get_tile_position, on_ladder, valid_floor_below, can_climb,
     maybe_snap_to_floor, try_move
 )
+from tilegrid import neighbourhood
 from collections import deque
 
 
 
 
 class Villain:
-    def __init__(self, map_data, spawn_xy, hue_shift=0, index=0, total=1, speed_multiplier=1.0):
+    def __init__(self, map_data, spawn_xy, hue_shift=0, index=0, total=1, speed_multiplier=1.0, nav=None,
+                 ai=DEFAULT_VILLAIN_AI):
         self.index = index
         self.name = f"Villain{index}"
         self.MOVE_SPEED = self.compute_speed(index, total, speed_multiplier)
         self.x, self.y = spawn_xy
+        self.prev_x, self.prev_y = self.x, self.y  # position at the start of the last step
         self.facing_left = False
         self.timer = 0
         self.frame = 0
@@ -27,12 +32,22 @@ class Villain:
         self.hit_times = deque()
         self._hue_shift = hue_shift
         self.sprites = self._load_villain_anim(hue_shift)
+        self.sprites_left = [get_flipped(sprite) for sprite in self.sprites]
         self.disabled_sprite = self._load_disabled_sprite()
         # For maintaining committed direction of travel
         self.last_dx = 0
         self.last_dy = 0
         self.tile_x = int(self.x // TILE_SIZE) # spawn location
         self.tile_y = int(self.y // TILE_SIZE) # spawn location
+        self.nav = nav  # shared NavGraph for the level (None = greedy steering only)
+        self.ai = ai    # one of VILLAIN_AI
+        # "ladder" AI state: ladder hunt, climb direction and stuck detection
+        self.seek_ladder = False
+        self.seek_dx = 0
+        self.climb_dy = 0
+        self.has_started_climbing = False
+        self.last_tile = None
+        self.stuck_counter = 0
 
 
     def compute_speed(self, index, total, speed_multiplier=1.0):
@@ -46,7 +61,7 @@ class Villain:
         min_speed = 1.2
         max_speed = 1.8
         t = index / max(1, total - 1)
-        return (min_speed + t * (max_speed - min_speed)) * speed_multiplier
+        return (min_speed + t * (max_speed - min_speed)) * speed_multiplier * STEP_SCALE
 
 
     def _load_villain_anim(self, hue_shift):
@@ -55,9 +70,7 @@ class Villain:
         :param hue_shift:
         :return:
         """
-        sheet = pygame.image.load("assets/sprites/sheet.png").convert_alpha()
-        base = [sheet.subsurface(pygame.Rect(i * TILE_SIZE, TILE_SIZE, TILE_SIZE, TILE_SIZE)) for i in range(4)]
-        return [hue_shift_sprite(s, hue_shift) for s in base]
+        return [get_hue_shifted(i, 1, hue_shift) for i in range(4)]
 
 
     def _load_disabled_sprite(self):
@@ -65,17 +78,18 @@ class Villain:
         Load and return the sprite used when the villain is disabled.
         :return:
         """
-        sheet = pygame.image.load("assets/sprites/sheet.png").convert_alpha()
-        rect = pygame.Rect(5 * TILE_SIZE, 1 * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-        return sheet.subsurface(rect)
+        return get_tile(5, 1)
 
 
-    def is_disabled(self):
+    def is_disabled(self, now_ms=None):
         """
         Check if the villain is currently disabled.
+        :param now_ms: game clock in ms (defaults to pygame ticks)
         :return:
         """
-        return self.disabled_until and pygame.time.get_ticks() < self.disabled_until
+        if now_ms is None:
+            now_ms = pygame.time.get_ticks()
+        return self.disabled_until and now_ms < self.disabled_until
 
 
     def register_hit(self, now_ms):
@@ -87,8 +101,12 @@ class Villain:
         self.hit_times.append(now_ms)
         while self.hit_times and now_ms - self.hit_times[0] > DISABLE_WINDOW_MS:
             self.hit_times.popleft()
-        if len(self.hit_times) >= 3 and not self.is_disabled():
+        if len(self.hit_times) >= 3 and not self.is_disabled(now_ms):
             self.disabled_until = now_ms + DISABLE_DURATION_MS
+            # Clear movement intent while disabled
+            self.seek_ladder = False
+            self.climb_dy = 0
+            self.has_started_climbing = False
 
 
     def handle_floor_collision(self, current_tile, cx, cy):
@@ -100,41 +118,55 @@ class Villain:
         :return:
         """
         if current_tile == 'F':
-            self.y -= 1.0
+            self.y -= 1.0 * STEP_SCALE  # 1 px per 60 Hz frame
+            if self.climb_dy > 0:
+                # climbing down into the floor: stop, or the next step climbs straight back in
+                self.climb_dy = 0
+                self.has_started_climbing = False
             return True
         return False
 
 
-    def update(self, player, map_data):
+    def update_disabled(self, now):
         """
-        Update the villain's state, including movement and animation.
-        :param player:
-        :param map_data:
-        :return:
+        Play the wake-up warning shortly before recovery and clear an expired disable.
+        :param now: game clock in ms
+        :return: True if the villain is still disabled
         """
-        self.timer += 1
-        now = pygame.time.get_ticks()
         # Wake-up warning 2 seconds before recovery
-        if self.is_disabled() and self.disabled_until - now <= 1000:
+        if self.is_disabled(now) and self.disabled_until - now <= 1000:
             if not hasattr(self, "_wake_warned") or not self._wake_warned:
-                if not hasattr(self, "_wake_sound"):
-                    self._wake_sound = pygame.mixer.Sound("assets/sounds/villain-wake.wav")
-                    self._wake_sound.set_volume(0.6)
-                self._wake_sound.play()
+                audio.play("wake")
                 self._wake_warned = True
         # Clear disabled state if expired
         if self.disabled_until and now >= self.disabled_until:
             self.disabled_until = 0
             self._wake_warned = False  # reset for next disable cycle
-        if self.is_disabled():
+        return bool(self.is_disabled(now))
+
+
+    def update(self, player, map_data, now_ms=None):
+        """
+        Update the villain's state, including movement and animation.
+        :param player:
+        :param map_data:
+        :param now_ms: game clock in ms (defaults to pygame ticks)
+        :return:
+        """
+        self.timer += 1
+        now = pygame.time.get_ticks() if now_ms is None else now_ms
+        if self.update_disabled(now):
             return
         maybe_snap_to_floor(self, map_data)
-        if self.timer % 10 == 0:
+        if self.timer % ANIM_TICKS == 0:
             self.frame = (self.frame + 1) % len(self.sprites)
         cx, cy = get_tile_position(self)
         current_tile = map_data[cy][cx]
         if self.handle_floor_collision(current_tile, cx, cy):
             return
+        if self.ai == "ladder":
+            self._ladder_movement(player, map_data, current_tile, cx, cy)
+            return
         self._decide_movement(player, cx, cy, map_data)
 
 
@@ -162,15 +194,17 @@ class Villain:
         :param map_data:
         :return:
         """
-        st = get_surrounding_tiles(self, map_data)
-        conlog(f"{self.name} at tile ({cx},{cy}) sees: {st['locen']} {ord(st['locen'])}")
-        if self.delta_to_align_x() > 1 and st['right'] != 'B' and st['left'] != 'B' and st['locen'] != ' ':
+        upleft, upcen, upright, left, center, right, loleft, locen, loright = neighbourhood(map_data, cx, cy)
+        if log_enabled("villain", DEBUG):
+            conlog("%s at tile (%d,%d) sees: %s %d", self.name, cx, cy, locen, ord(locen),
+                   level=DEBUG, category="villain")
+        if self.delta_to_align_x() > 1 and right != 'B' and left != 'B' and locen != ' ':
             if self.last_dx != 0 :
                 #conlog("not aligned x")
                 try_move(self, self.last_dx, 0, map_data)
             return
-        if st['locen'] == ' ':
-            conlog(f"{self.name} trying to snap to floor")
+        if locen == ' ':
+            conlog("%s trying to snap to floor", self.name, level=DEBUG, category="villain")
             self.choose_snap(map_data)
             return
         if self.delta_to_align_y() > 1:
@@ -180,6 +214,10 @@ class Villain:
             return
         # Determine player offset (tile-based)
         pcx, pcy = get_tile_position(player)
+        step = self.nav.next_step((cx, cy), (pcx, pcy), (self.last_dx, self.last_dy)) if self.nav else None
+        if step is not None:
+            self._follow_step(step, map_data)
+            return
         dx = pcx - cx
         dy = pcy - cy
         center_tile = map_data[cy][cx]
@@ -214,53 +252,286 @@ class Villain:
             # idax = 0
             # iday = -1 if dy < 0 else 1 if dy > 0 else 0
         # conlog(f"{self.name} final intended direction: idax={idax}, iday={iday}")
-        if st['locen'] == " ":
-            conlog(f"ALERT {self.name} is over empty space, cannot move.")
+        if locen == " ":
+            conlog("ALERT %s is over empty space, cannot move.", self.name, level=DEBUG, category="villain")
             self.choose_snap(map_data)
         # At this point you can proceed with movement attempt based on idax/iday
         self.last_dx = idax
         self.last_dy = iday
         if idax != 0:
-            if st['loleft'] not in {'F', 'T'} and idax == -1:
-                conlog(f"no floor left {st['loleft']}")
+            if loleft not in {'F', 'T'} and idax == -1:
+                conlog("no floor left %s", loleft, level=DEBUG, category="villain")
                 idax = 1
                 # return
-            if st['loright'] not in {'F', 'T'} and idax == 1:
-                conlog(f"no floor right {st['loright']}")
+            if loright not in {'F', 'T'} and idax == 1:
+                conlog("no floor right %s", loright, level=DEBUG, category="villain")
                 idax = -1
                 # return
             self.facing_left = idax > 0  # optional flip
             moved = try_move(self, idax, 0, map_data)
             if moved:
-                conlog(f"{self.name} moved horizontally: idax={idax}")
+                conlog("%s moved horizontally: idax=%d", self.name, idax, level=DEBUG, category="villain")
             return
         if iday != 0:
             moved = try_move(self, 0, iday, map_data)
             if moved:
-                conlog(f"{self.name} moved vertically: iday={iday}")
+                conlog("%s moved vertically: iday=%d", self.name, iday, level=DEBUG, category="villain")
             return
         # conlog(f"{self.name} did not move this frame.")
 
 
+    def _follow_step(self, step, map_data):
+        """
+        Take one move along the cached shortest path to the player.
+        :param step: (dx, dy) from NavGraph.next_step
+        :param map_data:
+        :return:
+        """
+        idax, iday = step
+        self.last_dx = idax
+        self.last_dy = iday
+        if idax != 0:
+            self.facing_left = idax > 0  # optional flip
+        try_move(self, idax, iday, map_data)
+
+
+    def _ladder_movement(self, player, map_data, current_tile, cx, cy):
+        """
+        The "ladder" AI (part 3): unstick, follow a ladder hunt, climb towards the player's
+        row, otherwise walk at the player.
+        :param player:
+        :param map_data:
+        :param current_tile:
+        :param cx:
+        :param cy:
+        :return:
+        """
+        if self.handle_stuck_detection(cx, cy, map_data):
+            return
+        if self.handle_seek_ladder(player, map_data, cx, cy):
+            return
+        if self.try_climb_if_on_ladder(player, map_data, current_tile, cx, cy):
+            return
+        if self.is_aligned_with_player(player):
+            self.try_climb(player, map_data, cx, cy)
+        self.move_toward_player(player, map_data)
+
+
+    def handle_stuck_detection(self, cx, cy, map_data):
+        """
+        Detect if the villain is stuck in the same tile for too long and attempt to jostle free.
+        :param cx:
+        :param cy:
+        :param map_data:
+        :return:
+        """
+        current_pos = (cx, cy)
+        if self.last_tile == current_pos:
+            self.stuck_counter += 1
+            if self.stuck_counter > STUCK_TICKS:
+                self.jostle_villain(current_pos)
+                for dx in (-1, 1):
+                    if try_move(self, dx, 0, map_data):
+                        return True
+        else:
+            self.stuck_counter = 0
+            self.last_tile = current_pos
+        return False
+
+
+    def jostle_villain(self, current_pos):
+        """
+        Jostle the villain free after being stuck too long.
+        :param current_pos:
+        :return:
+        """
+        conlog("%s stuck too long at %s, clearing flags and forcing move", self.name, current_pos,
+               level=DEBUG, category="villain")
+        self.seek_ladder = False
+        self.climb_dy = 0
+        self.has_started_climbing = False
+        self.stuck_counter = 0
+
+
+    def handle_seek_ladder(self, player, map_data, cx, cy):
+        """
+        Handle seeking a ladder when the villain is trying to reach the player vertically.
+        :param player:
+        :param map_data:
+        :param cx:
+        :param cy:
+        :return:
+        """
+        if not self.seek_ladder:
+            return False
+        self.facing_left = self.seek_dx > 0
+        if on_ladder(self, map_data):
+            if self.try_climb(player, map_data, cx, cy) and valid_floor_below(self, map_data):
+                self.seek_ladder = False
+        else:
+            try_move(self, self.seek_dx, 0, map_data)
+        return True
+
+
+    def try_climb_if_on_ladder(self, player, map_data, current_tile, cx, cy):
+        """
+        Attempt to climb if currently on a ladder tile.
+        :param player:
+        :param map_data:
+        :param current_tile:
+        :param cx:
+        :param cy:
+        :return:
+        """
+        return current_tile in ('L', 'U', 'D', 'E', 'T') and self.try_climb(player, map_data, cx, cy)
+
+
+    def move_toward_player(self, player, map_data):
+        """
+        Move horizontally toward the player, starting a ladder hunt the other way if blocked.
+        :param player:
+        :param map_data:
+        :return:
+        """
+        delta_x = player.x - self.x
+        if abs(delta_x) >= 1.0:
+            dx = 1 if delta_x > 0 else -1
+            self.facing_left = dx > 0
+            if not try_move(self, dx, 0, map_data):
+                cx, cy = get_tile_position(self)
+                if map_data[cy][cx] not in ('L', 'U', 'D', 'E'):
+                    self.seek_ladder = True
+                    self.seek_dx = -dx
+
+
+    def try_climb(self, player, map_data, cx, cy):
+        """
+        Attempt to climb up or down a ladder toward the player.
+        :param player:
+        :param map_data:
+        :param cx:
+        :param cy:
+        :return:
+        """
+        if self._should_exit_ladder(player, map_data):
+            self._exit_ladder(map_data)
+            return True
+        if not self._determine_climb_direction(player, map_data, cx, cy):
+            return False
+        return self._attempt_climb(map_data)
+
+
+    def _should_exit_ladder(self, player, map_data):
+        """
+        Determine if the villain should exit the ladder (aligned with player and at bottom).
+        :param player:
+        :param map_data:
+        :return:
+        """
+        if self.climb_dy == 0 or not self.has_started_climbing:
+            return False
+        vcx, vcy = get_tile_position(self)
+        _, pcy = get_tile_position(player)
+        loleft, loright = neighbourhood(map_data, vcx, vcy)[6::2]
+        tile_y_aligned = self.y % TILE_SIZE <= 2
+        return pcy == vcy and tile_y_aligned and (loleft == 'F' or loright == 'F')
+
+
+    def _exit_ladder(self, map_data):
+        """
+        Exit the ladder by moving left or right onto a floor tile.
+        :param map_data:
+        :return:
+        """
+        loleft, loright = neighbourhood(map_data, *get_tile_position(self))[6::2]
+        self.climb_dy = 0
+        self.has_started_climbing = False
+        self.seek_ladder = False
+        if loleft == 'F':
+            try_move(self, -1, 0, map_data)
+        elif loright == 'F':
+            try_move(self, 1, 0, map_data)
+
+
+    def _determine_climb_direction(self, player, map_data, cx, cy):
+        """
+        Determine the climb direction (up or down) based on player's vertical position.
+        :param player:
+        :param map_data:
+        :param cx:
+        :param cy:
+        :return:
+        """
+        if self.climb_dy != 0:
+            return True
+        up_possible = can_climb(-1, map_data, cx, cy)
+        down_possible = can_climb(1, map_data, cx, cy)
+        if not up_possible and not down_possible:
+            return False
+        dy = self.vertical_tile_distance(player)
+        if dy > 0 and down_possible:
+            self.climb_dy = 1
+        elif dy < 0 and up_possible:
+            self.climb_dy = -1
+        elif up_possible:
+            self.climb_dy = -1
+        else:
+            self.climb_dy = 1
+        return True
+
+
+    def _attempt_climb(self, map_data):
+        """
+        Attempt to move the villain vertically by climb_dy on the ladder.
+        :param map_data:
+        :return:
+        """
+        success = try_move(self, 0, self.climb_dy, map_data)
+        if success:
+            self.has_started_climbing = True
+        else:
+            self.climb_dy = 0
+            self.has_started_climbing = False
+        return success
+
+
+    def is_aligned_with_player(self, player):
+        """
+        Check if the villain is horizontally aligned with the player (same tile column).
+        :param player:
+        :return:
+        """
+        return get_tile_position(player)[0] == get_tile_position(self)[0]
+
+
+    def vertical_tile_distance(self, player):
+        """
+        Get the vertical tile distance from the villain to the player.
+        :param player:
+        :return:
+        """
+        return get_tile_position(player)[1] - get_tile_position(self)[1]
+
+
     def choose_snap(self, map_data):
         """
         Choose a direction to snap to the nearest floor tile if over empty space.
         :param map_data:
         :return:
         """
-        st = get_surrounding_tiles(self, map_data)
         cx, cy = get_tile_position(self)
-        conlog(f"ALERT {self.name} is over empty space, cannot move.")
-        if st['loleft'] != " ":
-            conlog(f"{self.name} snapping left to ({cx - 1}, {cy})")
+        upleft, upcen, upright, left, center, right, loleft, locen, loright = neighbourhood(map_data, cx, cy)
+        conlog("ALERT %s is over empty space, cannot move.", self.name, level=DEBUG, category="villain")
+        if loleft != " ":
+            conlog("%s snapping left to (%d, %d)", self.name, cx - 1, cy, level=DEBUG, category="villain")
             self.teleport_to_tile(cx - 1, cy)
             return
-        if st['loright'] != " ":
-            conlog(f"{self.name} snapping right to ({cx + 1}, {cy})")
+        if loright != " ":
+            conlog("%s snapping right to (%d, %d)", self.name, cx + 1, cy, level=DEBUG, category="villain")
             self.teleport_to_tile(cx + 1, cy)
             return
-        if st['upcen'] != " ":
-            conlog(f"{self.name} snapping right to ({cx}, {cy - 1})")
+        if upcen != " ":
+            conlog("%s snapping up to (%d, %d)", self.name, cx, cy - 1, level=DEBUG, category="villain")
             self.teleport_to_tile(cx, cy - 1)
             return
 
@@ -273,19 +544,22 @@ class Villain:
         """
         self.x = tile_x * TILE_SIZE
         self.y = tile_y * TILE_SIZE
+        self.prev_x, self.prev_y = self.x, self.y  # don't interpolate across the jump
 
 
-    def draw(self, surface, offset_y=0):
+    def draw(self, surface, offset_y=0, now_ms=None, alpha=1.0, offset_x=0):
         """
         Draw the villain onto the given surface with vertical offset.
         :param surface:
         :param offset_y:
+        :param now_ms: game clock in ms (defaults to pygame ticks)
+        :param alpha: interpolation between the previous and current step (0.0-1.0)
+        :param offset_x: horizontal offset (minus the camera x when scrolling)
         :return:
         """
-        if self.is_disabled():
+        if self.is_disabled(now_ms):
             sprite = self.disabled_sprite
         else:
-            sprite = self.sprites[self.frame]
-            if self.facing_left:
-                sprite = pygame.transform.flip(sprite, True, False)
-        surface.blit(sprite, (int(self.x), int(self.y + offset_y)))
+            sprite = (self.sprites_left if self.facing_left else self.sprites)[self.frame]
+        x, y = lerp_position(self, alpha)
+        surface.blit(sprite, (int(x + offset_x), int(y + offset_y)))
@@ -7,9 +7,77 @@ import numpy as np
 import pygame.surfarray
 
 
+def rgb_to_hsv(rgb):
+    """
+    Vectorized equivalent of colorsys.rgb_to_hsv over an (..., 3) float array in 0-1.
+    :param rgb:
+    :return:
+    """
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    delta = maxc - minc
+    grey = delta == 0
+    safe_delta = np.where(grey, 1.0, delta)
+    s = np.where(maxc > 0, delta / np.where(maxc > 0, maxc, 1.0), 0.0)
+    rc = (maxc - r) / safe_delta
+    gc = (maxc - g) / safe_delta
+    bc = (maxc - b) / safe_delta
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = (h / 6.0) % 1.0
+    h[grey] = 0.0
+    s[grey] = 0.0
+    return np.stack((h, s, maxc), axis=-1)
+
+
+def hsv_to_rgb(hsv):
+    """
+    Vectorized equivalent of colorsys.hsv_to_rgb over an (..., 3) float array in 0-1.
+    :param hsv:
+    :return:
+    """
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i.astype(np.int64) % 6
+    r = np.choose(i, (v, q, p, p, t, v))
+    g = np.choose(i, (t, v, v, q, p, p))
+    b = np.choose(i, (p, p, t, v, v, q))
+    return np.stack((r, g, b), axis=-1)
+
+
 def hue_shift_sprite(surface, shift):
     """
-    Apply a hue shift to a Pygame surface.
+    Apply a hue shift to a Pygame surface. The whole surface is converted in one batched
+    NumPy pass, so a full sheet costs about the same number of calls as a single tile.
+    :param surface:
+    :param shift:
+    :return:
+    """
+    if shift == 0:
+        return surface.copy()  # cheap copy with no processing
+    surface = surface.convert_alpha()
+    rgb_array = pygame.surfarray.array3d(surface).astype(np.float32) / 255.0
+    alpha_array = pygame.surfarray.array_alpha(surface)
+    hsv = rgb_to_hsv(rgb_array)
+    hsv[..., 0] = (hsv[..., 0] + shift) % 1.0
+    # Truncate back to 0-255 the same way the colorsys version did
+    rgb_shifted = (hsv_to_rgb(hsv) * 255.0).astype(np.uint8)
+    result = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+    pygame.surfarray.blit_array(result, rgb_shifted)
+    result_lock = pygame.surfarray.pixels_alpha(result)
+    result_lock[:, :] = alpha_array
+    del result_lock
+    return result
+
+
+def hue_shift_sprite_reference(surface, shift):
+    """
+    Original per-pixel colorsys implementation of hue_shift_sprite, kept as the reference
+    for benchmark.py and for checking the vectorized version.
     :param surface:
     :param shift:
     :return:
@@ -34,4 +102,3 @@ def hue_shift_sprite(surface, shift):
     result_lock[:, :] = alpha_array
     del result_lock
     return result
-
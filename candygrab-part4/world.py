@@ -0,0 +1,147 @@
+# world.py
+
+
+from loader import prepare_level, play_level_music
+from tilemap import make_tile_map
+from camera import Camera
+from player import Player
+from display import update_villains, update_beams
+from scanner import scan_world, CandyIndex
+from combat import handle_firing, check_and_trigger_player_death
+from occupancy import TileOccupancy
+from fire import beam_pool
+from audio import audio
+from profiler import NullProfiler
+from timestep import remember_position
+from swarm import VillainSwarm, SWARM_MIN_VILLAINS
+from game_init import HUDState, spawn_villains
+from constants import DEFAULT_VILLAIN_AI
+
+
+class World:
+    """
+    All per-level game state plus the per-frame simulation step. The windowed game loop and
+    the headless runner both drive the game through step(), so they run identical logic.
+    """
+    def __init__(self, all_levels, music_volume=None, candy_sound=None, render=True, level_index=0,
+                 preloader=None, profiler=None, swarm_min_villains=SWARM_MIN_VILLAINS, villain_ai=None):
+        self.all_levels = all_levels
+        self.villain_ai = villain_ai  # overrides each level's "villain_ai" when set
+        self.swarm_min_villains = swarm_min_villains
+        self.preloader = preloader
+        self.profiler = profiler or NullProfiler()
+        self.music_volume = music_volume
+        self.candy_sound = candy_sound
+        self.render = render
+        self.hud = HUDState()
+        self.level_index = 0
+        self.loop_count = 0
+        self.level = None
+        self.map_data = None
+        self.tile_lookup = None
+        self.tile_map = None
+        self.camera = None
+        self.candy_index = None
+        self.player = None
+        self.villains = []
+        self.swarm = None
+        self.beams = []
+        self.occupancy = TileOccupancy()
+        self.load_level(level_index)
+
+
+    def load_level(self, index):
+        """
+        Load the level at index and (re)spawn everything in it. With a preloader the level is
+        normally already prepared, and preparation of the following level is queued.
+        :param index:
+        :return:
+        """
+        self.level_index = index
+        speed_multiplier = 1.0 + 0.15 * self.loop_count
+        nav = None
+        if self.preloader:
+            prepared = self.preloader.get(index)
+            self.level, self.tile_lookup, nav = prepared.level, prepared.tile_lookup, prepared.nav
+            self.map_data, self.tile_map = prepared.instantiate(self.render)
+            spawns = prepared.spawns
+            self.preloader.request((index + 1) % len(self.all_levels))
+            audio.prefetch_music(self.all_levels[(index + 1) % len(self.all_levels)].get("music"))
+        else:
+            self.level, self.map_data, self.tile_lookup, spawns = prepare_level(self.all_levels, index,
+                                                                                with_spawns=True)
+            self.tile_map = make_tile_map(self.map_data, self.tile_lookup) if self.render else None
+        play_level_music(self.level, self.music_volume)
+        ai = self.villain_ai or self.level.get("villain_ai", DEFAULT_VILLAIN_AI)
+        if spawns:
+            self.candy_index = CandyIndex(spawns.candy)
+            self.player = Player(self.map_data, spawn=spawns.player)
+            self.villains = spawn_villains(self.map_data, speed_multiplier=speed_multiplier, nav=nav,
+                                           spawns=spawns.villains, ai=ai)
+        else:
+            self.candy_index = CandyIndex.from_map(self.map_data)
+            self.player = Player(self.map_data)
+            self.villains = spawn_villains(self.map_data, speed_multiplier=speed_multiplier, nav=nav, ai=ai)
+        self.camera = Camera.for_map(self.map_data)
+        self.camera.follow(self.player.x, self.player.y)
+        self.swarm = None
+        if ai == "nav" and len(self.villains) >= self.swarm_min_villains and VillainSwarm.supports(self.map_data):
+            self.swarm = VillainSwarm(self.villains, self.map_data)
+        for beam in self.beams:
+            beam_pool.release(beam)
+        self.beams.clear()
+        self.hud.level_number = self.level["id"] + self.loop_count * len(self.all_levels)
+
+
+    def next_level(self):
+        """
+        Advance to the next level, wrapping to the first (and speeding villains up) after the last.
+        :return:
+        """
+        index = self.level_index + 1
+        if index >= len(self.all_levels):
+            index = 0
+            self.loop_count += 1
+        self.load_level(index)
+
+
+    def level_complete(self):
+        """
+        Check whether every candy on the level has been collected.
+        :return:
+        """
+        return self.candy_index.is_empty()
+
+
+    def step(self, dx, dy, fire_pressed, now_ms):
+        """
+        Advance the simulation by one fixed step (1 / SIM_HZ seconds).
+        :param dx: horizontal input (-1, 0, 1)
+        :param dy: vertical input (-1, 0, 1)
+        :param fire_pressed: whether fire was pressed since the last step
+        :param now_ms: game clock in ms
+        :return: True if the level was completed this step
+        """
+        player, villains, map_data, prof = self.player, self.villains, self.map_data, self.profiler
+        remember_position(player)
+        for v in villains:
+            remember_position(v)
+        with prof.section("player.update"):
+            player.update(dx, dy, map_data, now_ms=now_ms)
+        with prof.section("update_villains"):
+            if self.swarm:
+                self.swarm.update(player, map_data, now_ms)
+            else:
+                update_villains(villains, player, map_data, now_ms)
+            self.occupancy.rebuild(villains)
+        if fire_pressed:
+            with prof.section("handle_firing"):
+                handle_firing(player, map_data, villains, self.beams, now_ms, self.hud, self.occupancy)
+        with prof.section("update_beams"):
+            update_beams(self.beams, now_ms)
+        with prof.section("check_death"):
+            check_and_trigger_player_death(player, villains, map_data, now_ms, self.occupancy)
+        with prof.section("scan_world"):
+            scan_world(map_data, player, villains, self.tile_lookup, self.hud, candy_sound=self.candy_sound,
+                       tile_map=self.tile_map, candy_index=self.candy_index, occupancy=self.occupancy)
+        return self.candy_index.is_empty()
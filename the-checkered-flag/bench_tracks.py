@@ -0,0 +1,162 @@
+# bench_tracks.py
+#
+# Times track startup for every mask in levels/: building the class grid, each detector,
+# the distance fields and the whole Track() constructor. For comparison it also times a
+# single get_at sweep over the mask, which is what each detector used to cost on its own,
+# point queries, and waypoint labeling on a mask of many large blobs.
+#   python bench_tracks.py [--levels levels] [--repeat 3]
+
+
+import os
+import glob
+import time
+import argparse
+import numpy as np
+import pygame
+from core.track import Track, build_class_grid, build_distance_fields, label_components
+
+
+QUERIES = 10000
+
+
+def best_of(fn, repeat):
+    """
+    Return the best wall-clock time (ms) of fn() over repeat runs, and its last result.
+    :param fn:
+    :param repeat:
+    :return:
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0, result
+
+
+def get_at_sweep(surface):
+    """
+    Read every pixel once with get_at (the per-detector cost before the class grid).
+    :param surface:
+    :return:
+    """
+    width, height = surface.get_size()
+    count = 0
+    for y in range(height):
+        for x in range(width):
+            if surface.get_at((x, y))[:3] == (0, 0, 0):
+                count += 1
+    return count
+
+
+def flood_fill_centroids(mask):
+    """
+    The previous waypoint finder: 8-connected DFS with a visited set, one pixel at a time.
+    :param mask: (height, width) bool array
+    :return: list of (x, y) centroids in discovery order
+    """
+    height, width = mask.shape
+    visited = set()
+    centroids = []
+    ys, xs = np.nonzero(mask)
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        if (x, y) in visited:
+            continue
+        stack = [(x, y)]
+        visited.add((x, y))
+        pixels = []
+        while stack:
+            cx, cy = stack.pop()
+            pixels.append((cx, cy))
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    nx, ny = cx + dx, cy + dy
+                    if (dx or dy) and 0 <= nx < width and 0 <= ny < height and \
+                            (nx, ny) not in visited and mask[ny, nx]:
+                        visited.add((nx, ny))
+                        stack.append((nx, ny))
+        px, py = zip(*pixels)
+        centroids.append((sum(px) / len(px), sum(py) / len(py)))
+    return centroids
+
+
+def bench_waypoint_blobs(repeat):
+    """
+    Compare the flood fill against run-length labeling on a 640x480 mask full of large blobs.
+    :param repeat:
+    :return:
+    """
+    mask = np.zeros((480, 640), dtype=bool)
+    for row in range(12):
+        for col in range(16):
+            mask[row * 40 + 5:row * 40 + 35, col * 40 + 5:col * 40 + 35] = True
+    mask[100:400, 200:500] = True
+    flood_ms, expected = best_of(lambda: flood_fill_centroids(mask), 1)
+    label_ms, (centroids, pixels, boxes) = best_of(lambda: label_components(mask), repeat)
+    same = expected == [tuple(c) for c in centroids.tolist()]
+    print(f"waypoint blobs ({len(pixels)} blobs, {int(pixels.sum())} px)")
+    print(f"  flood fill       {flood_ms:8.2f} ms")
+    print(f"  run labeling     {label_ms:8.2f} ms   identical: {same}")
+
+
+def bench_track(mask_path, repeat):
+    """
+    Time startup stages for one track mask and print a summary line.
+    :param mask_path:
+    :param repeat:
+    :return:
+    """
+    track_ms, track = best_of(lambda: Track(mask_path, 3), repeat)
+    analyze_ms, _ = best_of(track._analyze, repeat)
+    grid_ms, _ = best_of(lambda: build_class_grid(track.mask_image), repeat)
+    start_ms, _ = best_of(track._find_start_line_pixels, repeat)
+    spawn_ms, _ = best_of(track._find_spawn_line_pixels, repeat)
+    waypoint_ms, _ = best_of(track._find_waypoints, repeat)
+    pos_ms, _ = best_of(track._calculate_start_pos, repeat)
+    fields_ms, _ = best_of(lambda: build_distance_fields(track.grid), repeat)
+    sweep_ms, _ = best_of(lambda: get_at_sweep(track.mask_image), 1)
+    xs = [(i * 7919) % track.width + 0.5 for i in range(QUERIES)]
+    ys = [(i * 104729) % track.height + 0.5 for i in range(QUERIES)]
+    query_ms, _ = best_of(lambda: [track.is_crashing(x, y) for x, y in zip(xs, ys)], repeat)
+    batch_ms, _ = best_of(lambda: track.classify_points(xs, ys), repeat)
+    print(f"{mask_path} ({track.width}x{track.height}, {len(track.waypoints)} waypoints)")
+    print(f"  Track()          {track_ms:8.2f} ms (from .trackcache.npz after the first run)")
+    print(f"  full analysis    {analyze_ms:8.2f} ms (no cache)")
+    print(f"  class grid       {grid_ms:8.2f} ms")
+    print(f"  start line       {start_ms:8.2f} ms")
+    print(f"  spawn line       {spawn_ms:8.2f} ms")
+    print(f"  waypoints        {waypoint_ms:8.2f} ms")
+    print(f"  start position   {pos_ms:8.2f} ms")
+    print(f"  distance fields  {fields_ms:8.2f} ms")
+    print(f"  one get_at sweep {sweep_ms:8.2f} ms (reference)")
+    print(f"  {QUERIES} is_crashing {query_ms:8.2f} ms, one classify_points call {batch_ms:6.2f} ms")
+
+
+def define_args():
+    """
+    Define command line arguments for the benchmark.
+    :return:
+    """
+    parser = argparse.ArgumentParser(description="Benchmark track loading.")
+    parser.add_argument("--levels", default="levels", help="folder of *_mask.png files")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is reported)")
+    return parser.parse_args()
+
+
+def main():
+    """
+    Benchmark every track mask in the levels folder.
+    :return:
+    """
+    args = define_args()
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    for mask_path in sorted(glob.glob(os.path.join(args.levels, "*_mask.png"))):
+        bench_track(mask_path, args.repeat)
+    bench_waypoint_blobs(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import math
 import random
 from collections import deque
 
+
 class BaseCar:
     def __init__(self, start_pos):
         self.x, self.y = start_pos
@@ -50,21 +51,11 @@ class BaseCar:
             self.y = new_y
             self._crash_recently = False
         if track.is_crashing(self.x, self.y):
-            max_radius = 20
-            found = False
-            for r in range(1, max_radius):
-                for angle_deg in range(0, 360, 15):
-                    rad = math.radians(angle_deg)
-                    check_x = int(self.x + r * math.cos(rad))
-                    check_y = int(self.y + r * math.sin(rad))
-                    if track.is_on_track(check_x, check_y):
-                        self.x = check_x
-                        self.y = check_y
-                        self.speed = 0
-                        found = True
-                        break
-                if found:
-                    break
+            # snap to the nearest on-track pixel, precomputed per pixel by the track
+            nearest = track.nearest_on_track(self.x, self.y)
+            if nearest is not None:
+                self.x, self.y = nearest
+                self.speed = 0
 
     def draw(self, surface):
         """
@@ -158,7 +149,7 @@ class PlayerCar(BaseCar):
 
 class AICar(BaseCar):
     def __init__(self, start_pos, waypoints, track, index=0,
-                 debug_this_ai=False):  # debug_this_ai can be kept for later
+                 debug_this_ai=False, wall_avoid_dist=16):  # debug_this_ai can be kept for later
         super().__init__(start_pos)
         self.image = pygame.image.load("assets/cars/ai_car.png").convert_alpha()
         self.waypoints = waypoints  # CCW ordered list from track.py
@@ -170,6 +161,7 @@ class AICar(BaseCar):
         self.last_cross = False      # For debouncing S/F line crossing
         self.index = index  # For identification
         self.debug_ai = debug_this_ai  # Basic debug flag
+        self.wall_avoid_dist = wall_avoid_dist  # Steer away from walls closer than this (0 = off)
         # Simpler initial angle: Try to face the first waypoint if waypoints exist
         if self.waypoints:
             target_x, target_y = self.waypoints[self.current_waypoint_index]
@@ -209,6 +201,7 @@ class AICar(BaseCar):
         delta_y = target_y - self.y
         angle_to_target_rad = math.atan2(-delta_y, delta_x)
         desired_angle_deg = math.degrees(angle_to_target_rad) - 90
+        desired_angle_deg = self._avoid_walls(track, desired_angle_deg)
         desired_angle_deg %= 360
         angle_diff = (desired_angle_deg - self.angle + 180 + 360) % 360 - 180
         turn_amount = 0
@@ -272,3 +265,24 @@ class AICar(BaseCar):
         :return:
         """
         return len(self.checkpoints_hit) >= len(self.waypoints)
+
+    def _avoid_walls(self, track, desired_angle_deg):
+        """
+        Bend the desired heading towards open track when a wall is near, using the wall
+        distance gradient; the closer the wall, the stronger the pull (at most half way).
+        :param track:
+        :param desired_angle_deg:
+        :return:
+        """
+        if self.wall_avoid_dist <= 0:
+            return desired_angle_deg
+        clearance = track.wall_distance_at(self.x, self.y)
+        if clearance >= self.wall_avoid_dist:
+            return desired_angle_deg
+        gx, gy = track.wall_gradient_at(self.x, self.y)
+        if gx == 0 and gy == 0:
+            return desired_angle_deg
+        away_deg = math.degrees(math.atan2(-gy, gx)) - 90
+        weight = (1 - clearance / self.wall_avoid_dist) * 0.5
+        diff = (away_deg - desired_angle_deg + 180) % 360 - 180
+        return desired_angle_deg + diff * weight
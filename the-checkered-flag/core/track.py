@@ -3,6 +3,8 @@
 
 import pygame
 import math
+import numpy as np
+from core.trackcache import mask_digest, load_cache, save_cache
 
 
 GRAY = (128, 128, 128)
@@ -12,6 +14,201 @@ BLUE = (0, 0, 255)
 MAGENTA = (255, 0, 255)
 GREEN = (0, 255, 0)
 
+# Per-pixel classes of the mask, stored in Track.grid (anything else, e.g. anti-aliased
+# edges, is CLASS_OTHER)
+CLASS_OTHER = 0
+CLASS_TRACK = 1        # gray
+CLASS_WALL = 2         # white
+CLASS_START_LINE = 3   # black
+CLASS_SPAWN = 4        # green
+CLASS_WAYPOINT = 5     # blue
+CLASS_START_POS = 6    # magenta
+CLASS_OUTSIDE = 255    # returned for points off the mask
+CLASS_COLORS = ((GRAY, CLASS_TRACK), (WHITE, CLASS_WALL), (BLACK, CLASS_START_LINE),
+                (GREEN, CLASS_SPAWN), (BLUE, CLASS_WAYPOINT), (MAGENTA, CLASS_START_POS))
+
+
+def build_class_grid(surface):
+    """
+    Classify every pixel of a track mask in one vectorized pass.
+    :param surface:
+    :return: (height, width) uint8 array of CLASS_* values
+    """
+    rgb = pygame.surfarray.array3d(surface).astype(np.uint32)
+    packed = ((rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]).T
+    grid = np.zeros(packed.shape, dtype=np.uint8)
+    for (r, g, b), cls in CLASS_COLORS:
+        grid[packed == ((r << 16) | (g << 8) | b)] = cls
+    return grid
+
+
+def _find(parent, i):
+    """
+    Union-find root of i, with path halving.
+    :param parent:
+    :param i:
+    :return:
+    """
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def label_components(mask):
+    """
+    Label the 8-connected components of a boolean mask using horizontal runs and union-find:
+    runs are found with NumPy, and only runs in neighbouring rows are ever compared.
+    :param mask: (height, width) bool array
+    :return: (centroids (n, 2) float [x, y], pixel counts (n,) int, bounding boxes (n, 4) int
+             [x0, y0, x1, y1] inclusive), components in order of their first pixel (row-major)
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    run_y, run_x0 = np.nonzero(edges == 1)
+    _, run_x1 = np.nonzero(edges == -1)
+    run_x1 = run_x1 - 1  # inclusive end
+    n = len(run_y)
+    if n == 0:
+        return np.zeros((0, 2)), np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.int64)
+    parent = list(range(n))
+    ys, x0s, x1s = run_y.tolist(), run_x0.tolist(), run_x1.tolist()
+    row_start = np.searchsorted(run_y, np.arange(height + 1)).tolist()
+    for y in range(1, height):
+        # two-pointer sweep over the runs of rows y - 1 and y; diagonal contact counts (8-connected)
+        a, a_end = row_start[y - 1], row_start[y]
+        b, b_end = row_start[y], row_start[y + 1]
+        while a < a_end and b < b_end:
+            if x0s[a] <= x1s[b] + 1 and x0s[b] <= x1s[a] + 1:
+                ra, rb = _find(parent, a), _find(parent, b)
+                if ra != rb:
+                    parent[max(ra, rb)] = min(ra, rb)
+            if x1s[a] < x1s[b]:
+                a += 1
+            else:
+                b += 1
+    roots = np.array([_find(parent, i) for i in range(n)])
+    # roots are the lowest run index of each component, i.e. its first run in row-major order
+    unique_roots, labels = np.unique(roots, return_inverse=True)
+    lengths = run_x1 - run_x0 + 1
+    count = len(unique_roots)
+    pixels = np.bincount(labels, weights=lengths, minlength=count).astype(np.int64)
+    # exact integer sums, so centroids match summing every pixel's coordinates
+    sum_x = np.zeros(count, dtype=np.int64)
+    sum_y = np.zeros(count, dtype=np.int64)
+    np.add.at(sum_x, labels, (run_x0 + run_x1) * lengths // 2)
+    np.add.at(sum_y, labels, run_y * lengths)
+    centroids = np.stack([sum_x / pixels, sum_y / pixels], axis=1)
+    boxes = np.empty((count, 4), dtype=np.int64)
+    boxes[:, 0] = np.full(count, width)
+    boxes[:, 1] = np.full(count, height)
+    boxes[:, 2:] = -1
+    np.minimum.at(boxes[:, 0], labels, run_x0)
+    np.minimum.at(boxes[:, 1], labels, run_y)
+    np.maximum.at(boxes[:, 2], labels, run_x1)
+    np.maximum.at(boxes[:, 3], labels, run_y)
+    return centroids, pixels, boxes
+
+
+def _nearest_in_rows(seeds):
+    """
+    Column of the nearest seed in the same row, for every pixel.
+    :param seeds: (height, width) bool array
+    :return: int64 array, -1 where the row has no seed
+    """
+    height, width = seeds.shape
+    xs = np.broadcast_to(np.arange(width), (height, width))
+    none = 4 * width
+    left = np.maximum.accumulate(np.where(seeds, xs, -none), axis=1)
+    right = np.minimum.accumulate(np.where(seeds, xs, none)[:, ::-1], axis=1)[:, ::-1]
+    col = np.where(right - xs < xs - left, right, left)
+    col[(col < 0) | (col >= width)] = -1
+    return col
+
+
+def _lower_envelope(f):
+    """
+    For every (y, x), the row y' minimising (y - y')^2 + f[y', x]: the lower envelope of one
+    parabola per row, built for all columns at once (loop over rows, vectorized over columns).
+    :param f: (height, width) float array
+    :return: int64 array of rows
+    """
+    height, width = f.shape
+    cols = np.arange(width)
+    fy = f + (np.arange(height, dtype=np.float64) ** 2)[:, None]
+    # where row q's parabola crosses row q - 1's, the top of every stack before any pops
+    crossings = np.diff(fy, axis=0) / 2.0
+    sites = np.zeros((height, width), dtype=np.int64)   # envelope stack per column
+    bounds = np.full((height, width), -np.inf)           # where each stacked site takes over
+    top = np.zeros(width, dtype=np.int64)                # stack height - 1 per column
+    top_bound = bounds[0].copy()
+    for q in range(1, height):
+        fq = fy[q]
+        s = crossings[q - 1].copy()
+        pop = np.flatnonzero(s <= top_bound)
+        while pop.size:
+            # the new parabola hides the top one in these columns: drop it and retry there
+            slot = top[pop] - 1
+            top[pop] = slot
+            prev = sites[slot, pop]
+            s[pop] = (fq[pop] - fy[prev, pop]) / (2.0 * (q - prev))
+            pop = pop[s[pop] <= bounds[slot, pop]]
+        top += 1
+        sites[top, cols] = q
+        bounds[top, cols] = s
+        top_bound = s
+    # each row belongs to the last stacked site whose interval starts at or before it
+    depth = int(top.max()) + 1
+    start = np.maximum(np.ceil(bounds[:depth]), 0)
+    slots = np.broadcast_to(np.arange(depth)[:, None], (depth, width))
+    live = (start < height) & (slots <= top)
+    mark = np.zeros((height, width), dtype=np.int64)
+    mark[start[live].astype(np.int64), np.broadcast_to(cols, (depth, width))[live]] = slots[live]
+    return sites[np.maximum.accumulate(mark, axis=0), cols]
+
+
+def nearest_seeds(*seed_masks):
+    """
+    Exact nearest-seed (feature) transform by two separable passes: the nearest seed within
+    each row, then the lower envelope down each column. All masks share one envelope pass.
+    :param seed_masks: (height, width) bool arrays of the same shape
+    :return: list of (seed y, seed x, squared distance) int64 arrays per mask; seed -1 and a
+             huge distance where a mask has no seeds
+    """
+    height, width = seed_masks[0].shape
+    xs = np.arange(width)
+    cols = [_nearest_in_rows(seeds) for seeds in seed_masks]
+    f = np.hstack([np.where(col >= 0, (xs - col) ** 2, 1e12) for col in cols])
+    rows = _lower_envelope(f)
+    ys = np.arange(height)[:, None]
+    fields = []
+    for i, col in enumerate(cols):
+        seed_y = rows[:, i * width:(i + 1) * width]
+        seed_x = np.take_along_axis(col, seed_y, axis=0)
+        dist2 = (ys - seed_y) ** 2 + (xs - seed_x) ** 2
+        missing = seed_x < 0
+        seed_y = np.where(missing, -1, seed_y)
+        dist2[missing] = 1 << 40
+        fields.append((seed_y, seed_x, dist2))
+    return fields
+
+
+def build_distance_fields(grid):
+    """
+    Distance to the nearest wall (the area off the mask counts as wall) and the nearest
+    on-track pixel for every pixel of a class grid.
+    :param grid:
+    :return: (wall distance float32, nearest track y int16, nearest track x int16)
+    """
+    height, width = grid.shape
+    (_, _, wall_d2), (track_y, track_x, _) = nearest_seeds(grid == CLASS_WALL, grid == CLASS_TRACK)
+    yy, xx = np.mgrid[0:height, 0:width]
+    edge = np.minimum(np.minimum(xx + 1, width - xx), np.minimum(yy + 1, height - yy))
+    wall_distance = np.minimum(np.sqrt(wall_d2), edge).astype(np.float32)
+    return wall_distance, track_y.astype(np.int16), track_x.astype(np.int16)
+
 
 class Track:
     def __init__(self, mask_path, laps_required):
@@ -19,11 +216,14 @@ class Track:
         self.width = self.mask_image.get_width()
         self.height = self.mask_image.get_height()
         self.laps_required = laps_required
-        self.start_line_pixels = self._find_start_line_pixels()
-        self.spawn_line_pixels = self._find_spawn_line_pixels()
-        self.waypoints = self._find_waypoints()
-        self.crossing_axis, self.crossing_direction = self._analyze_start_line_direction()
-        self.start_pos = self._calculate_start_pos()
+        self.mask_digest = mask_digest(mask_path)
+        cache = load_cache(mask_path, self.mask_digest)
+        self.from_cache = cache is not None
+        if self.from_cache:
+            self._restore(cache)
+        else:
+            self._analyze()
+            save_cache(mask_path, self.mask_digest, **self._cache_arrays())
         try:
             self.font = pygame.font.SysFont("Arial", 18, bold=True)
         except pygame.error:
@@ -34,17 +234,87 @@ class Track:
         # print(f"Waypoints found: {len(self.waypoints)}. Order: {[(int(w[0]), int(w[1])) for w in self.waypoints]}")
         # print(f"Crossing axis: {self.crossing_axis}, required direction: {self.crossing_direction}")
 
+    def _analyze(self):
+        """
+        Derive everything about the track from the mask image.
+        :return:
+        """
+        self.grid = build_class_grid(self.mask_image)
+        self._cells = self.grid.tobytes()  # row-major copy for fast scalar lookups
+        self.start_line_pixels = self._find_start_line_pixels()
+        self.spawn_line_pixels = self._find_spawn_line_pixels()
+        self.waypoints = self._find_waypoints()
+        self.crossing_axis, self.crossing_direction = self._analyze_start_line_direction()
+        self.start_pos = self._calculate_start_pos()
+        self.wall_distance, self.nearest_track_y, self.nearest_track_x = build_distance_fields(self.grid)
+        self._init_wall_gradient()
+
+
+    def _init_wall_gradient(self):
+        """
+        Gradient of the wall distance (points away from the nearest wall).
+        :return:
+        """
+        self.wall_gradient_y, self.wall_gradient_x = np.gradient(self.wall_distance)
+
+
+    def _cache_arrays(self):
+        """
+        Arrays stored in the track cache: the class grid and the results of the slow analysis.
+        :return:
+        """
+        return {
+            "grid": self.grid,
+            "waypoints": np.array(self.waypoints, dtype=np.float64).reshape(-1, 2),
+            "waypoint_pixels": self.waypoint_pixels,
+            "waypoint_boxes": self.waypoint_boxes,
+            "crossing_axis": self.crossing_axis,
+            "crossing_direction": self.crossing_direction,
+            "start_pos": np.array(self.start_pos, dtype=np.int64),
+            "wall_distance": self.wall_distance,
+            "nearest_track_y": self.nearest_track_y,
+            "nearest_track_x": self.nearest_track_x,
+        }
+
+
+    def _restore(self, cache):
+        """
+        Restore the analysis from a cache written by _cache_arrays.
+        :param cache:
+        :return:
+        """
+        self.grid = cache["grid"]
+        self._cells = self.grid.tobytes()
+        self.start_line_pixels = self._find_start_line_pixels()
+        self.spawn_line_pixels = self._find_spawn_line_pixels()
+        self.waypoints = [tuple(p) for p in cache["waypoints"].tolist()]
+        self.waypoint_pixels = cache["waypoint_pixels"]
+        self.waypoint_boxes = cache["waypoint_boxes"]
+        self.crossing_axis = str(cache["crossing_axis"])
+        self.crossing_direction = int(cache["crossing_direction"])
+        self.start_pos = tuple(cache["start_pos"].tolist())
+        self.wall_distance = cache["wall_distance"]
+        self.nearest_track_y = cache["nearest_track_y"]
+        self.nearest_track_x = cache["nearest_track_x"]
+        self._init_wall_gradient()
+
+
+    def _pixels_of(self, cls):
+        """
+        Return the set of (x, y) pixels of the given class.
+        :param cls:
+        :return:
+        """
+        ys, xs = np.nonzero(self.grid == cls)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+
     def _find_spawn_line_pixels(self):
         """
         Find all pixels that are part of the spawn line (green pixels).
         :return:
         """
-        pixels = set()
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.mask_image.get_at((x, y))[:3] == GREEN:
-                    pixels.add((x, y))
-        return pixels
+        return self._pixels_of(CLASS_SPAWN)
 
 
     def _find_start_line_pixels(self):
@@ -52,12 +322,7 @@ class Track:
         Find all pixels that are part of the start line (black pixels).
         :return:
         """
-        pixels = set()
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.mask_image.get_at((x, y))[:3] == BLACK:
-                    pixels.add((x, y))
-        return pixels
+        return self._pixels_of(CLASS_START_LINE)
 
 
     def _analyze_start_line_direction(self):
@@ -90,10 +355,10 @@ class Track:
         Calculate a safe starting position near the start/finish line.
         :return:
         """
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.mask_image.get_at((x, y))[:3] == MAGENTA:
-                    return (x, y)
+        magenta = np.flatnonzero(self.grid == CLASS_START_POS)
+        if magenta.size:
+            y, x = divmod(int(magenta[0]), self.width)
+            return (x, y)
         if not self.start_line_pixels:
             print("Warning: No start line pixels for _calculate_start_pos fallback. Using default.")
             return (100, 100)
@@ -108,12 +373,12 @@ class Track:
                 if not (0 <= px < self.width and 0 <= py < self.height):
                     continue
                 is_safe_spot = True
-                if self.mask_image.get_at((px, py))[:3] == GRAY:
+                if self.grid[py, px] == CLASS_TRACK:
                     for sx_offset in range(-1, 2):
                         for sy_offset in range(-1, 2):
                             check_x, check_y = px + sx_offset, py + sy_offset
                             if not (0 <= check_x < self.width and 0 <= check_y < self.height and \
-                                    self.mask_image.get_at((check_x, check_y))[:3] == GRAY):
+                                    self.grid[check_y, check_x] == CLASS_TRACK):
                                 is_safe_spot = False
                                 break
                         if not is_safe_spot:
@@ -125,67 +390,54 @@ class Track:
 
     def _find_waypoints(self):
         """
-        Find all clusters of blue pixels in the mask image and calculate their centroids.
+        Find all clusters of blue pixels in the mask image and calculate their centroids,
+        ordered counter-clockwise starting from the one nearest the start line. Pixel counts
+        and bounding boxes, in the same order, are kept in waypoint_pixels / waypoint_boxes.
         :return:
         """
-        visited = set()
-        clusters_pixels_list = []
-        for y_coord in range(self.height):
-            for x_coord in range(self.width):
-                if self.mask_image.get_at((x_coord, y_coord))[:3] == BLUE and (x_coord, y_coord) not in visited:
-                    current_cluster_pixels = []
-                    stack = [(x_coord, y_coord)]
-                    visited.add((x_coord, y_coord))
-                    while stack:
-                        cx_pixel, cy_pixel = stack.pop()
-                        current_cluster_pixels.append((cx_pixel, cy_pixel))
-                        for dx_offset in [-1, 0, 1]:
-                            for dy_offset in [-1, 0, 1]:
-                                if dx_offset == 0 and dy_offset == 0:
-                                    continue
-                                nx, ny = cx_pixel + dx_offset, cy_pixel + dy_offset
-                                if (0 <= nx < self.width and 0 <= ny < self.height and
-                                        (nx, ny) not in visited and
-                                        self.mask_image.get_at((nx, ny))[:3] == BLUE):
-                                    visited.add((nx, ny))
-                                    stack.append((nx, ny))
-                    if current_cluster_pixels:
-                        clusters_pixels_list.append(current_cluster_pixels)
-        if not clusters_pixels_list:
-            return []
-        waypoint_centroids = []
-        for pixel_list in clusters_pixels_list:
-            if not pixel_list: continue
-            xs, ys = zip(*pixel_list)
-            centroid_x = sum(xs) / len(xs)
-            centroid_y = sum(ys) / len(ys)
-            waypoint_centroids.append((centroid_x, centroid_y))
-        if not waypoint_centroids:
-            return []
+        centroids, pixels, boxes = label_components(self.grid == CLASS_WAYPOINT)
+        waypoint_centroids = [tuple(c) for c in centroids.tolist()]
+        order = list(range(len(waypoint_centroids)))
         if len(waypoint_centroids) > 1:
             sort_pivot_x = sum(p[0] for p in waypoint_centroids) / len(waypoint_centroids)
             sort_pivot_y = sum(p[1] for p in waypoint_centroids) / len(waypoint_centroids)
-            def angle_from_pivot(point):
-                point_x, point_y = point
-                # --- THIS IS THE CRITICAL CHANGE FOR CCW SORTING ---
+            def angle_from_pivot(i):
+                point_x, point_y = waypoint_centroids[i]
                 # To get CCW order with atan2(y,x) where Pygame's Y increases downwards,
                 # we use (pivot_y - point_y) as the "y" component for atan2.
                 return math.atan2(sort_pivot_y - point_y, point_x - sort_pivot_x)
-            waypoint_centroids.sort(key=angle_from_pivot)  # Sorts ascending by angle
-        if self.start_line_pixels and waypoint_centroids:
+            order.sort(key=angle_from_pivot)  # Sorts ascending by angle
+        if self.start_line_pixels and order:
             sfx_sum = sum(x_pix for x_pix, y_pix in self.start_line_pixels)
             sfy_sum = sum(y_pix for x_pix, y_pix in self.start_line_pixels)
             sfx_center = sfx_sum / len(self.start_line_pixels)
             sfy_center = sfy_sum / len(self.start_line_pixels)
             closest_index = 0
             min_dist_sq = float('inf')
-            for i, (wp_x, wp_y) in enumerate(waypoint_centroids):
+            for i, index in enumerate(order):
+                wp_x, wp_y = waypoint_centroids[index]
                 dist_sq = (wp_x - sfx_center) ** 2 + (wp_y - sfy_center) ** 2
                 if dist_sq < min_dist_sq:
                     min_dist_sq = dist_sq
                     closest_index = i
-            waypoint_centroids = waypoint_centroids[closest_index:] + waypoint_centroids[:closest_index]
-        return waypoint_centroids
+            order = order[closest_index:] + order[:closest_index]
+        self.waypoint_pixels = pixels[order]
+        self.waypoint_boxes = boxes[order]
+        return [waypoint_centroids[i] for i in order]
+
+    def classify_points(self, xs, ys):
+        """
+        Classify many points (e.g. every car) in one call by indexing the class grid.
+        :param xs: sequence or array of x coordinates
+        :param ys: sequence or array of y coordinates
+        :return: uint8 array of CLASS_* values, CLASS_OUTSIDE for points off the mask
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        classes = np.full(xs.shape, CLASS_OUTSIDE, dtype=np.uint8)
+        classes[inside] = self.grid[ys[inside].astype(np.intp), xs[inside].astype(np.intp)]
+        return classes
 
     def is_on_track(self, x, y):
         """
@@ -194,21 +446,63 @@ class Track:
         :param y:
         :return:
         """
-        if not (0 <= x < self.width and 0 <= y < self.height):
-            return False
-        return self.mask_image.get_at((int(x), int(y)))[:3] == GRAY
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self._cells[int(y) * self.width + int(x)] == CLASS_TRACK
+        return False
 
     def is_crashing(self, x, y):
         """
-        Check if the given coordinates are crashing (white area).
+        Check if the given coordinates are crashing (white area or off the mask).
+        :param x:
+        :param y:
+        :return:
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self._cells[int(y) * self.width + int(x)] == CLASS_WALL
+        return True
+
+    def _clamped_cell(self, x, y):
+        """
+        Return the (row, column) of the pixel under (x, y), clamped onto the mask.
+        :param x:
+        :param y:
+        :return:
+        """
+        return min(max(int(y), 0), self.height - 1), min(max(int(x), 0), self.width - 1)
+
+    def nearest_on_track(self, x, y):
+        """
+        Return the on-track (gray) pixel nearest to (x, y), or None if the track has none.
+        :param x:
+        :param y:
+        :return:
+        """
+        row, col = self._clamped_cell(x, y)
+        ny = int(self.nearest_track_y[row, col])
+        if ny < 0:
+            return None
+        return int(self.nearest_track_x[row, col]), ny
+
+    def wall_distance_at(self, x, y):
+        """
+        Distance in pixels from (x, y) to the nearest wall (0 off the mask).
         :param x:
         :param y:
         :return:
         """
         if not (0 <= x < self.width and 0 <= y < self.height):
-            return True
-        pixel = self.mask_image.get_at((int(x), int(y)))[:3]
-        return pixel == WHITE
+            return 0.0
+        return float(self.wall_distance[int(y), int(x)])
+
+    def wall_gradient_at(self, x, y):
+        """
+        Return the (dx, dy) direction in which the wall distance grows fastest at (x, y).
+        :param x:
+        :param y:
+        :return:
+        """
+        row, col = self._clamped_cell(x, y)
+        return float(self.wall_gradient_x[row, col]), float(self.wall_gradient_y[row, col])
 
     def crossed_start_line(self, x, y, prev_x, prev_y, tag="player"):
         """
@@ -220,9 +514,10 @@ class Track:
         :param tag:
         :return:
         """
-        if not (0 <= int(x) < self.width and 0 <= int(y) < self.height):
+        xi, yi = int(x), int(y)
+        if not (0 <= xi < self.width and 0 <= yi < self.height):
             return False
-        if self.mask_image.get_at((int(x), int(y)))[:3] != BLACK:
+        if self._cells[yi * self.width + xi] != CLASS_START_LINE:
             return False
         passed_correctly = False
         if self.crossing_axis == "x":
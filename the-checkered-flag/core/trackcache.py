@@ -0,0 +1,85 @@
+# core/trackcache.py
+#
+# Sidecar cache for data derived from a track mask, stored next to it
+# (levels/track1_mask.png -> levels/track1_mask.trackcache.npz): the class grid, waypoints,
+# start line crossing axis/direction, start position and distance fields. Entries are keyed
+# by a hash of the mask file's bytes, so editing the mask invalidates the cache automatically.
+
+
+import os
+import hashlib
+import tempfile
+import numpy as np
+
+
+CACHE_VERSION = 3
+
+
+def cache_path(mask_path):
+    """
+    Return the cache file path for a mask.
+    :param mask_path:
+    :return:
+    """
+    root, _ = os.path.splitext(mask_path)
+    return root + ".trackcache.npz"
+
+
+def mask_digest(mask_path):
+    """
+    Hash the mask file's contents.
+    :param mask_path:
+    :return:
+    """
+    with open(mask_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_cache(mask_path, digest):
+    """
+    Load the cached arrays for a mask, if the cache exists and matches its digest. A
+    missing, stale or unreadable (e.g. truncated) cache is a miss, so it gets rebuilt.
+    :param mask_path:
+    :param digest: mask_digest() of the mask
+    :return: dict of arrays, or None
+    """
+    try:
+        with np.load(cache_path(mask_path)) as data:
+            if int(data["version"]) != CACHE_VERSION or str(data["digest"]) != digest:
+                return None
+            return {name: data[name] for name in data.files}
+    except Exception:
+        return None
+
+
+def save_cache(mask_path, digest, **arrays):
+    """
+    Write the cache for a mask. It is written to a temporary file and moved into place, so
+    an interrupted run never leaves a partial cache behind. Failures (e.g. a read-only
+    folder) only cost the speed-up.
+    :param mask_path:
+    :param digest: mask_digest() of the mask
+    :param arrays: named arrays to store
+    :return:
+    """
+    path = cache_path(mask_path)
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(path) + ".",
+                                        dir=os.path.dirname(path) or ".")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, version=CACHE_VERSION, digest=digest, **arrays)
+        # mkstemp creates the file owner-only; give it the permissions a normal file would get
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+        tmp_path = None
+    except OSError as e:
+        print(f"Could not write track cache for {mask_path}: {e}")
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
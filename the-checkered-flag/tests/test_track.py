@@ -0,0 +1,57 @@
+# tests/test_track.py
+#
+# Checks Track.classify_points against the scalar queries the cars use.
+#   python -m pytest tests
+
+
+import os
+import sys
+import random
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from core.track import Track, CLASS_TRACK, CLASS_WALL, CLASS_OUTSIDE
+
+
+@pytest.fixture(scope="module")
+def track():
+    """
+    Track 1, loaded from the project folder on a hidden display.
+    :return:
+    """
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    try:
+        yield Track("levels/track1_mask.png", 3)
+    finally:
+        os.chdir(cwd)
+
+
+def test_classify_points_matches_scalar_queries(track):
+    rng = random.Random(1)
+    xs = [rng.uniform(-20, track.width + 20) for _ in range(5000)]
+    ys = [rng.uniform(-20, track.height + 20) for _ in range(5000)]
+    classes = track.classify_points(xs, ys)
+    assert classes.shape == (5000,)
+    for x, y, cls in zip(xs, ys, classes.tolist()):
+        inside = 0 <= x < track.width and 0 <= y < track.height
+        assert cls == (track.grid[int(y), int(x)] if inside else CLASS_OUTSIDE)
+        assert (cls == CLASS_TRACK) == track.is_on_track(x, y)
+        assert (cls in (CLASS_WALL, CLASS_OUTSIDE)) == track.is_crashing(x, y)
+
+
+def test_classify_points_edges(track):
+    xs = np.array([0, track.width - 0.5, track.width, -0.5, 3.7])
+    ys = np.array([0, track.height - 0.5, 0, 0, track.height])
+    classes = track.classify_points(xs, ys)
+    assert classes[0] == track.grid[0, 0]
+    assert classes[1] == track.grid[track.height - 1, track.width - 1]
+    assert classes[2:].tolist() == [CLASS_OUTSIDE] * 3
+    assert track.classify_points([], []).shape == (0,)